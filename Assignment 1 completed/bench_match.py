@@ -0,0 +1,75 @@
+import time
+
+from match import compile_pattern
+
+
+def time_match(pattern, source, repeat=5):
+    """Times how long one match of pattern against source takes.
+
+    Args:
+        pattern - a CompiledPattern
+        source - a list of strings
+        repeat - how many times to run the match (the fastest run is kept)
+
+    Returns:
+        the best time in seconds
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pattern.match(source)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def long_source_cases(sizes, percents):
+    """Builds (name, pattern, source) benchmark cases on long sources.
+
+    "adversarial" alternates % and "a" over a source made only of a's, with a
+    "b" that never shows up. A naive backtracking matcher tries every way of
+    splitting the source between the %'s, which is exponential in the number
+    of %'s.
+    "hit" is a pattern that only matches once the %'s give words back.
+
+    Args:
+        sizes - a list of source lengths
+        percents - a list of how many %'s to put in the pattern
+
+    Returns:
+        a list of tuples (name, pattern as a list of strings, source)
+    """
+    cases = []
+    for n in sizes:
+        for k in percents:
+            cases.append(("adversarial n=%d %%=%d" % (n, k),
+                          ["%", "a"] * k + ["b", "%"],
+                          ["a"] * n))
+            cases.append(("hit n=%d %%=%d" % (n, k),
+                          ["x"] + ["%", "z"] * k,
+                          ["x"] + ["y", "z"] * (n // 2)))
+    return cases
+
+
+def run(sizes=(1000, 10000, 100000), percents=(1, 4, 16)):
+    """Runs the greedy and the backtracking matcher over long_source_cases and
+        prints the time per match in milliseconds.
+
+    Args:
+        sizes - a list of source lengths
+        percents - a list of how many %'s to put in the pattern
+    """
+    print("%-28s %12s %12s %10s" % ("case", "greedy ms", "backtrack ms", "match"))
+    for name, pattern, source in long_source_cases(sizes, percents):
+        greedy = compile_pattern(pattern)
+        table = compile_pattern(pattern, backtrack=True)
+        found = table.match(source) is not None
+        print("%-28s %12.3f %12.3f %10s" % (name,
+                                           time_match(greedy, source) * 1000,
+                                           time_match(table, source) * 1000,
+                                           found))
+
+
+if __name__ == "__main__":
+    run()
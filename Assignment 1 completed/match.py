@@ -1,4 +1,11 @@
-def match(pattern, source):
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from heapq import merge
+from itertools import islice
+
+
+def match(pattern, source, backtrack=False):
     """Attempt to match pattern to source. % matches a sequence of zero or
         more words and _ matches any single word.
 
@@ -7,6 +14,11 @@ def match(pattern, source):
                   to match/extract words from the source
         source - a list of string. A phrase/sentence/question represented as
                  a list of words (strings).
+        backtrack - by default a % greedily stops at the first word equal to the
+                    next pattern word and never reconsiders. If True, every way
+                    of splitting the source is considered (in O(len(pattern) *
+                    len(source)) time) and each % takes the shortest span that
+                    still lets the rest of the pattern match.
 
     Returns:
         if a match is detected, returns a list of strings - a list of matched
@@ -15,65 +27,402 @@ def match(pattern, source):
         else if no match is detected, returns None. 
 
     """
-    pind = 0
-    sind = 0
-    result = []
-
-   # while not at the end of the pattern OR not at the end of the source
-    while pind < len(pattern) or sind < len(source):
-        # 1 if at the end of the pattern
-        if pind >= len(pattern):
+    return compile_pattern(pattern, backtrack).match(source)
+
+
+class CompiledPattern:
+    """A pattern that has been preprocessed once so it can be matched against many
+        sources. Everything that only depends on the pattern (its length, where the
+        wildcards are, which literals are pinned to the start or the end of the
+        source) is worked out here instead of on every call to match.
+
+    Attributes:
+        tokens - the original pattern, a tuple of strings
+        length - the number of tokens in the pattern
+        wildcards - a tuple of the positions of the _'s and %'s in the pattern
+        backtrack - True if % is matched with the dynamic programming matcher
+                    instead of the greedy one (see match)
+        has_percent - True if the pattern contains at least one %
+        min_length - the shortest source that could possibly match (every token
+                     except % consumes exactly one word)
+        head - (position, literal) pairs that must appear at that position from
+               the start of the source
+        tail - (offset, literal) pairs that must appear at that (negative) offset
+               from the end of the source
+    """
+
+    def __init__(self, pattern, backtrack=False):
+        """Precomputes the wildcard positions, literal anchors and minimum source
+            length of pattern.
+
+        Args:
+            pattern - a list of strings, possibly containing % and/or _
+            backtrack - use the dynamic programming matcher for % (see match)
+        """
+        self.tokens = tuple(pattern)
+        self.backtrack = backtrack
+        self.length = len(self.tokens)
+        self.wildcards = tuple(i for i, tok in enumerate(self.tokens) if tok in ("_", "%"))
+        percents = [i for i, tok in enumerate(self.tokens) if tok == "%"]
+        self.has_percent = len(percents) > 0
+        self.min_length = self.length - len(percents)
+
+        # without a % every token sits at a fixed position, so all literals are
+        # anchored to the start. With a %, only the tokens before the first % are
+        # anchored to the start and the tokens after the last % to the end.
+        first = percents[0] if percents else self.length
+        last = percents[-1] if percents else self.length
+        self.head = tuple((i, tok) for i, tok in enumerate(self.tokens[:first])
+                          if tok != "_")
+        self.tail = tuple((i - self.length, tok)
+                          for i, tok in enumerate(self.tokens) if i > last and tok != "_")
+
+    def __repr__(self):
+        if self.backtrack:
+            return "CompiledPattern(%r, backtrack=True)" % (list(self.tokens),)
+        return "CompiledPattern(%r)" % (list(self.tokens),)
+
+    def could_match(self, source):
+        """Cheap rejection test - checks the length and literal anchors of source
+            without scanning it.
+
+        Args:
+            source - a list of strings
+
+        Returns:
+            False if source can not match the pattern, True if it might.
+        """
+        slen = len(source)
+        if slen < self.min_length:
+            return False
+        if not self.has_percent and slen != self.length:
+            return False
+        for i, tok in self.head:
+            if source[i] != tok:
+                return False
+        for i, tok in self.tail:
+            if source[i] != tok:
+                return False
+        return True
+
+    def match(self, source):
+        """Attempts to match the pattern to source. Same semantics as match().
+
+        Args:
+            source - a list of strings
+
+        Returns:
+            the list of matched words if a match is detected, else None.
+        """
+        if not self.could_match(source):
             return None
-        
-        # 2 if the current thing in pattern is a %
-        if pattern[pind] == "%":
-            # if the % is at the end of the pattern
-            if pind == len(pattern) - 1:
-                # grab the rest of the source, add it to result, return result
-                remaining = " ".join(source[sind:])
-                result.append(remaining if remaining else "")
-                return result
-            else:
-                # move along in pattern
+
+        # no % - every literal was already checked by could_match, so just
+        # pick out the words at the _ positions
+        if not self.has_percent:
+            return [source[i] for i in self.wildcards]
+        if self.backtrack:
+            return self._match_table(source)
+
+        pattern = self.tokens
+        plen = self.length
+        slen = len(source)
+        pind = 0
+        sind = 0
+        result = []
+
+        # while not at the end of the pattern OR not at the end of the source
+        while pind < plen or sind < slen:
+            # 1 if at the end of the pattern
+            if pind >= plen:
+                return None
+
+            # 2 if the current thing in pattern is a %
+            if pattern[pind] == "%":
+                # if the % is at the end of the pattern, grab the rest of the source
+                if pind == plen - 1:
+                    result.append(" ".join(source[sind:]))
+                    return result
+                # move along in pattern, accumulating from source until the
+                # current items in pattern and source are equal
                 pind += 1
-                # create a variable to accumulate stuff in
-                accumulated = []
-                # while current items in pattern and source are not equal
-                while (pind < len(pattern) and sind < len(source) and 
-                       pattern[pind] != source[sind]):
-                    # accumulate from source
-                    accumulated.append(source[sind])
-                    # move along in source
+                start = sind
+                target = pattern[pind]
+                while sind < slen and source[sind] != target:
                     sind += 1
                 # if we ran out of items in source, then no match
-                if sind >= len(source):
+                if sind >= slen:
                     return None
-                # add the accumulated item into result
-                result.append(" ".join(accumulated) if accumulated else "")
-        
-        # 3 if we reached the end of the source
-        elif sind >= len(source):
-            return None
-        
-        # 4 if the current thing in the pattern is an _
-        elif pattern[pind] == "_":
-            # add item from source to result
-            result.append(source[sind])
-            # move along in pattern and source
-            pind += 1
-            sind += 1
-        
-        # 5 if the current thing in the pattern == the current thing in the source
-        elif pattern[pind] == source[sind]:
-            # move along in pattern and source
-            pind += 1
-            sind += 1
-        
-        # 6 else - thus current things are unequal
-        else:
+                result.append(" ".join(source[start:sind]))
+
+            # 3 if we reached the end of the source
+            elif sind >= slen:
+                return None
+
+            # 4 if the current thing in the pattern is an _
+            elif pattern[pind] == "_":
+                result.append(source[sind])
+                pind += 1
+                sind += 1
+
+            # 5 if the current thing in the pattern == the current thing in the source
+            elif pattern[pind] == source[sind]:
+                pind += 1
+                sind += 1
+
+            # 6 else - thus current things are unequal
+            else:
+                return None
+
+        return result
+
+    def _match_table(self, source):
+        """Matches source by dynamic programming instead of greedily, so a % can
+            give words back when the rest of the pattern needs them.
+            ok[p][s] is 1 if pattern[p:] matches source[s:]; the table is filled
+            from the end, then walked from the start giving each % the shortest
+            span that keeps the rest matchable. O(len(pattern) * len(source)).
+
+        Args:
+            source - a list of strings
+
+        Returns:
+            the list of matched words if a match is detected, else None.
+        """
+        pattern = self.tokens
+        plen = self.length
+        slen = len(source)
+
+        ok = [None] * (plen + 1)
+        ok[plen] = bytearray(slen + 1)
+        ok[plen][slen] = 1
+        for p in range(plen - 1, -1, -1):
+            row = bytearray(slen + 1)
+            nxt = ok[p + 1]
+            tok = pattern[p]
+            if tok == "%":
+                # % matches nothing (nxt[s]) or one more word (row[s + 1])
+                row[slen] = nxt[slen]
+                for s in range(slen - 1, -1, -1):
+                    row[s] = nxt[s] or row[s + 1]
+            elif tok == "_":
+                row[:slen] = nxt[1:]
+            else:
+                for s in range(slen):
+                    if nxt[s + 1] and source[s] == tok:
+                        row[s] = 1
+            ok[p] = row
+
+        if not ok[0][0]:
             return None
-    
-    return result
+
+        result = []
+        s = 0
+        for p in range(plen):
+            tok = pattern[p]
+            if tok == "%":
+                nxt = ok[p + 1]
+                end = s
+                while not nxt[end]:
+                    end += 1
+                result.append(" ".join(source[s:end]))
+                s = end
+            else:
+                if tok == "_":
+                    result.append(source[s])
+                s += 1
+        return result
+
+
+@lru_cache(maxsize=1024)
+def _compile_tokens(tokens, backtrack):
+    return CompiledPattern(tokens, backtrack)
+
+
+def compile_pattern(pattern, backtrack=False):
+    """Turns pattern into a reusable CompiledPattern. Compiled patterns are cached,
+        so compiling the same pattern twice returns the same object.
+
+    Args:
+        pattern - a list of strings (or an already compiled pattern)
+        backtrack - use the dynamic programming matcher for % (see match)
+
+    Returns:
+        a CompiledPattern for pattern
+    """
+    if isinstance(pattern, CompiledPattern) and pattern.backtrack == backtrack:
+        return pattern
+    if isinstance(pattern, CompiledPattern):
+        pattern = pattern.tokens
+    return _compile_tokens(tuple(pattern), backtrack)
+
+class PatternIndex:
+    """Dispatch index over an ordered list of patterns. Patterns are stored in a
+        trie keyed on their leading literals (the words before the first _ or %),
+        patterns starting with a wildcard live at the root. For a given source only
+        the patterns along the source's path through the trie are tried, in their
+        original order, so the first pattern that matches is the same one a linear
+        scan would have found.
+
+    Attributes:
+        patterns - the list of CompiledPatterns, in their original order
+        root - the root trie node, a pair [children, ids] where children maps a
+               word to the next node and ids lists (in order) the patterns whose
+               leading literals end at this node
+    """
+
+    def __init__(self, patterns):
+        """Compiles patterns and builds the trie.
+
+        Args:
+            patterns - a list of patterns (lists of strings or CompiledPatterns)
+        """
+        self.patterns = [compile_pattern(p) for p in patterns]
+        self.root = [{}, []]
+        for i, pattern in enumerate(self.patterns):
+            node = self.root
+            for tok in pattern.tokens:
+                if tok == "_" or tok == "%":
+                    break
+                node = node[0].setdefault(tok, [{}, []])
+            node[1].append(i)
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def candidates(self, source):
+        """Returns the indices of the patterns that could match source, in their
+            original order. The buckets met along the way are merged lazily, so a
+            caller that stops at the first match never walks the rest.
+
+        Args:
+            source - a list of strings
+
+        Returns:
+            an iterator over pattern indices, in increasing order
+        """
+        node = self.root
+        buckets = [node[1]] if node[1] else []
+        for tok in source:
+            node = node[0].get(tok)
+            if node is None:
+                break
+            if node[1]:
+                buckets.append(node[1])
+        if not buckets:
+            return iter(())
+        if len(buckets) == 1:
+            return iter(buckets[0])
+        return merge(*buckets)
+
+    def first_match(self, source):
+        """Finds the first pattern (in original order) that matches source.
+
+        Args:
+            source - a list of strings
+
+        Returns:
+            a tuple (index of the pattern, list of matched words), or None if no
+            pattern matches.
+        """
+        patterns = self.patterns
+        for i in self.candidates(source):
+            bindings = patterns[i].match(source)
+            if bindings is not None:
+                return i, bindings
+        return None
+
+
+def _match_chunk(tokens, backtrack, start, chunk):
+    """Worker for match_many - matches one chunk of sources in a pool process.
+
+    Args:
+        tokens - the pattern as a tuple of strings
+        backtrack - use the dynamic programming matcher for %
+        start - the index of the first source in chunk
+        chunk - a list of sources (lists of strings or whitespace separated strings)
+
+    Returns:
+        a list of (index, matched words) tuples for the sources that matched
+    """
+    pattern = compile_pattern(tokens, backtrack)
+    hits = []
+    for i, source in enumerate(chunk, start):
+        if isinstance(source, str):
+            source = source.split()
+        bindings = pattern.match(source)
+        if bindings is not None:
+            hits.append((i, bindings))
+    return hits
+
+
+def match_many(pattern, sources, backtrack=False, processes=None, chunksize=1000):
+    """Matches one pattern against a stream of sources. Sources are pulled from
+        the iterable one at a time (or one chunk at a time when using a pool),
+        so memory stays flat however long the stream is.
+
+    Args:
+        pattern - a list of strings (or a CompiledPattern)
+        sources - an iterable of sources, each a list of strings or a string
+                  that gets split on whitespace
+        backtrack - use the dynamic programming matcher for % (see match)
+        processes - if more than 1, chunks of sources are matched in a pool of
+                    this many processes. Only a few chunks per process are in
+                    flight at any time
+        chunksize - the number of sources sent to a pool process at once
+
+    Returns:
+        a generator of (index, matched words) tuples for the sources that
+        matched, in the order of the sources
+    """
+    pattern = compile_pattern(pattern, backtrack)
+    if not processes or processes <= 1:
+        for i, source in enumerate(sources):
+            if isinstance(source, str):
+                source = source.split()
+            bindings = pattern.match(source)
+            if bindings is not None:
+                yield i, bindings
+        return
+
+    sources = iter(sources)
+    pending = deque()
+    start = 0
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        try:
+            while True:
+                # keep a couple of chunks per process queued up
+                while len(pending) < 2 * processes:
+                    chunk = list(islice(sources, chunksize))
+                    if not chunk:
+                        break
+                    pending.append(pool.submit(_match_chunk, pattern.tokens, backtrack,
+                                               start, chunk))
+                    start += len(chunk)
+                if not pending:
+                    return
+                yield from pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def scan_file(pattern, path, backtrack=False, processes=None, chunksize=1000):
+    """Matches pattern against every line of a text file, one line at a time.
+        Each line is a source, split on whitespace.
+
+    Args:
+        pattern - a list of strings (or a CompiledPattern)
+        path - the path of the file to scan
+        backtrack, processes, chunksize - see match_many
+
+    Returns:
+        a generator of (line number starting at 0, matched words) tuples for
+        the lines that matched
+    """
+    with open(path, encoding="utf-8") as file:
+        yield from match_many(pattern, file, backtrack, processes, chunksize)
+
 
 assert match(["x", "y", "z"], ["x", "y", "z"]) == [], "test 1 failed"
 assert match(["x", "z", "z"], ["x", "y", "z"]) == None, "test 2 failed"
@@ -95,3 +444,32 @@ assert match(["_", "_", "_", "%"], ["x", "y", "z"]) == [
         "",
     ], "test 14 failed"
 assert match(["x", "%", "z"], ["x", "y", "z", "z", "z"]) == None, "test 15 failed"
+
+p = compile_pattern(["x", "%", "z"])
+assert compile_pattern(["x", "%", "z"]) is p, "compile_pattern cache test"
+assert p.min_length == 2 and p.head == ((0, "x"),) and p.tail == ((-1, "z"),), "anchor test"
+assert p.match(["x", "y", "w", "z"]) == ["y w"], "compiled test 1"
+assert not p.could_match(["y", "y", "z"]), "compiled test 2"
+assert compile_pattern(["_", "b"]).match(["a", "b"]) == ["a"], "compiled test 3"
+
+index = PatternIndex([["a", "b", "_"], ["%", "c"], ["a", "%"], ["b"]])
+assert list(index.candidates(["a", "b", "c"])) == [0, 1, 2], "index test 1"
+assert list(index.candidates(["b", "x"])) == [1, 3], "index candidates merge test"
+assert list(index.candidates(["d"])) == [1], "index candidates root test"
+assert list(PatternIndex([["a"], ["b"]]).candidates(["c"])) == [], "index candidates empty test"
+lazy = index.candidates(["a", "b", "c"])
+assert iter(lazy) is lazy and next(lazy) == 0, "index candidates lazy test"
+assert index.first_match(["a", "x", "c"]) == (1, ["a x"]), "index test 2"
+assert index.first_match(["b"]) == (3, []), "index test 3"
+assert index.first_match(["d"]) == None, "index test 4"
+
+assert match(["x", "%", "z"], ["x", "y", "z", "z", "z"], backtrack=True) == ["y z z"], "backtrack test 1"
+assert match(["x", "%", "y"], ["x", "y", "z"], backtrack=True) == None, "backtrack test 2"
+assert match(["%", "b", "%", "c"], ["a", "b", "b", "c"], backtrack=True) == ["a", "b"], "backtrack test 3"
+assert match(["x", "%", "_"], ["x", "y", "z"], backtrack=True) == ["y", "z"], "backtrack test 4"
+assert match(["%", "%"], ["x"], backtrack=True) == ["", "x"], "backtrack test 5"
+
+assert list(match_many(["_", "is", "%"], ["sky is blue", ["x", "y"], "grass is green"])) == [
+        (0, ["sky", "blue"]),
+        (2, ["grass", "green"]),
+    ], "match_many test"
@@ -1,4 +1,265 @@
 import csv
+import hashlib
+import io
+import math
+import os
+import pickle
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+
+# ranks that are missing or not whole numbers in the csv are stored as this
+RANK_MISSING = 0
+
+# every country name seen in any feature gets one small integer id, so the
+# columns of different features can be lined up without comparing strings
+country_ids = {}
+
+# parsed tables are cached here, bump CACHE_VERSION when FeatureTable changes.
+# Cache files are unpickled, so they live next to this module rather than in
+# whatever the working directory happens to be
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".factbook_cache")
+CACHE_VERSION = 3
+
+# the short names the chatbot uses, and the csv files (under the world
+# factbook directory) they stand for
+CHATBOT_FEATURES = {"area": "geography/area.csv",
+                    "population": "people_and_society/population.csv",
+                    "median age": "people_and_society/median_age.csv",
+                    "life expectancy": "people_and_society/life_expectancy_at_birth.csv",
+                    "gdp": "economy/real_gdp_purchasing_power_parity.csv",
+                    "birth rate": "people_and_society/birth_rate.csv",
+                    "death rate": "people_and_society/death_rate.csv"}
+
+
+def country_id(name):
+    """Returns the integer id of a (lower case) country name, assigning the next
+        free id the first time a name is seen."""
+    cid = country_ids.get(name)
+    if cid is None:
+        cid = country_ids[name] = len(country_ids)
+    return cid
+
+
+def parse_rank(text):
+    """Parses a ranking field such as '12' into an int, RANK_MISSING if it is not
+        a whole number."""
+    try:
+        return int(text)
+    except (TypeError, ValueError):
+        return RANK_MISSING
+
+
+def parse_value(text):
+    """Parses a value field such as '1,397,897,720' or '$23,009,780,000,000'
+        into a float, nan if it is not a number."""
+    try:
+        return float(text.replace(",", "").replace("$", "").replace("%", ""))
+    except (AttributeError, ValueError):
+        return math.nan
+
+
+class FeatureTable(Mapping):
+    """One world factbook feature, parsed once into typed columns. Row i describes
+        the country names[i]. Numbers are parsed at load time, so lookups and
+        comparisons never parse strings.
+
+        The table is also a read-only mapping from name to [ranking, value] (both
+        strings, as in the csv), the same view load_csv returns, so code written
+        against the dictionaries keeps working.
+
+    Attributes:
+        names - a list of interned lower case country names
+        index - a dictionary mapping name to row number
+        ids - an array of the country_id of each row
+        ranks - an int array of rankings (RANK_MISSING if absent)
+        values - a float array of values (nan if absent)
+        raw_ranks - a list of the ranking strings from the csv
+        raw_values - a list of the value strings from the csv
+        by_rank - a dictionary mapping a ranking string to the first country
+                  with that ranking
+        by_value - an array of row numbers ordered by value, largest first
+                   (rows without a value left out), None until presort is called
+        by_ranking - an array of row numbers ordered by ranking (rows without a
+                     ranking left out), None until presort is called
+        sorted_ranks - the rankings of the by_ranking rows, for binary search
+    """
+
+    def __init__(self):
+        """Creates an empty table."""
+        self.names = []
+        self.index = {}
+        self.ids = array("l")
+        self.ranks = array("l")
+        self.values = array("d")
+        self.raw_ranks = []
+        self.raw_values = []
+        self.by_rank = {}
+        self.by_value = None
+        self.by_ranking = None
+        self.sorted_ranks = None
+
+    def add(self, name, ranking, value):
+        """Adds a row. If name is already in the table its row is replaced, like
+            assigning to a dictionary key.
+
+        Args:
+            name - the country name (lower case)
+            ranking - the ranking string from the csv
+            value - the value string from the csv
+        """
+        row = self.index.get(name)
+        if row is None:
+            name = sys.intern(name)
+            self.index[name] = len(self.names)
+            self.names.append(name)
+            self.ids.append(country_id(name))
+            self.ranks.append(parse_rank(ranking))
+            self.values.append(parse_value(value))
+            self.raw_ranks.append(ranking)
+            self.raw_values.append(value)
+            self.by_rank.setdefault(ranking, name)
+        else:
+            old = self.raw_ranks[row]
+            if self.by_rank.get(old) == name:
+                # hand the old ranking to the next country that has it, if any
+                del self.by_rank[old]
+                for other, other_rank in zip(self.names, self.raw_ranks):
+                    if other_rank == old and other != name:
+                        self.by_rank[old] = other
+                        break
+            self.by_rank.setdefault(ranking, self.names[row])
+            self.ranks[row] = parse_rank(ranking)
+            self.values[row] = parse_value(value)
+            self.raw_ranks[row] = ranking
+            self.raw_values[row] = value
+        self.by_value = None
+
+    def __getitem__(self, name):
+        row = self.index[name]
+        return [self.raw_ranks[row], self.raw_values[row]]
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return "<FeatureTable of %d countries>" % len(self.names)
+
+    def __getstate__(self):
+        # country ids are only meaningful within one process, so they (and the
+        # index, which is cheap to rebuild) are left out of pickles
+        state = self.__dict__.copy()
+        del state["ids"]
+        del state["index"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.names = [sys.intern(name) for name in self.names]
+        self.index = {name: row for row, name in enumerate(self.names)}
+        self.ids = array("l", (country_id(name) for name in self.names))
+
+    def rank(self, name):
+        """Returns the ranking of name as an int. Raises KeyError if not present."""
+        return self.ranks[self.index[name]]
+
+    def country_by_rank(self, ranking):
+        """Returns the first country with the given ranking (a string as in the
+            csv, or an int), None if no country has it."""
+        return self.by_rank.get(str(ranking))
+
+    def value(self, name):
+        """Returns the value of name as a float. Raises KeyError if not present."""
+        return self.values[self.index[name]]
+
+    def presort(self):
+        """Builds the by_value, by_ranking and sorted_ranks arrays used by top,
+            bottom and ranked_between. load_table calls this once, so queries
+            never sort."""
+        values = self.values
+        ranks = self.ranks
+        rows = range(len(self.names))
+        self.by_value = array("l", sorted((row for row in rows if values[row] == values[row]),
+                                          key=values.__getitem__, reverse=True))
+        self.by_ranking = array("l", sorted((row for row in rows if ranks[row] != RANK_MISSING),
+                                            key=ranks.__getitem__))
+        self.sorted_ranks = array("l", (ranks[row] for row in self.by_ranking))
+
+    def top(self, k):
+        """Returns the k countries with the largest values, largest first."""
+        if self.by_value is None:
+            self.presort()
+        return [self.names[row] for row in self.by_value[:max(k, 0)]]
+
+    def bottom(self, k):
+        """Returns the k countries with the smallest values, smallest first."""
+        if self.by_value is None:
+            self.presort()
+        if k <= 0:
+            return []
+        return [self.names[row] for row in reversed(self.by_value[-k:])]
+
+    def ranked_between(self, low, high):
+        """Returns the countries ranked low to high (inclusive), in rank order."""
+        if self.by_value is None:
+            self.presort()
+        start = bisect_left(self.sorted_ranks, low)
+        end = bisect_right(self.sorted_ranks, high)
+        return [self.names[row] for row in self.by_ranking[start:end]]
+
+    def as_dict(self):
+        """Returns a plain dictionary mapping name to [ranking, value] strings."""
+        return {name: [rank, value]
+                for name, rank, value in zip(self.names, self.raw_ranks, self.raw_values)}
+
+
+def load_table(file_name):
+    """Opens and reads the provided file into a FeatureTable, parsing every ranking
+        and value once.
+
+        Args:
+            The path of a csv file that contains some world factbook country comparison data.
+            The file must be one that includes the following fields: name, ranking, and value.
+
+        Returns:
+            A FeatureTable with one row per country.
+        """
+    with open(file_name, mode='r', newline='', encoding="utf-8") as file:
+        return parse_table(file)
+
+
+def parse_table(file):
+    """Parses an open csv file (or any iterable of csv lines) into a FeatureTable."""
+    table = FeatureTable()
+    for row in csv.DictReader(file):
+        table.add(row["name"].lower(), row["ranking"], row["value"])
+    table.presort()
+    return table
+
+
+def read_table(file_name):
+    """Like load_table, but also returns the sha1 hex digest of the file's bytes
+        (the file is read once for both)."""
+    with open(file_name, "rb") as file:
+        data = file.read()
+    table = parse_table(io.StringIO(data.decode("utf-8"), newline=""))
+    return table, hashlib.sha1(data).hexdigest()
+
+
+def file_digest(file_name):
+    """Returns the sha1 hex digest of a file's bytes."""
+    with open(file_name, "rb") as file:
+        return hashlib.sha1(file.read()).hexdigest()
 
 def load_csv(file_name):
     """Opens and reads the provided file. Creates a dictionary that maps name to a
@@ -17,32 +278,491 @@ def load_csv(file_name):
         Returns:
             A dictionary mapping 'name' to a list containing rank and value - both as strings. 
         """
-    #write your code here
+    return load_table(file_name).as_dict()
+
+
+def cache_path(file_name, cache_dir=CACHE_DIR):
+    """Returns the path of the cache file for a csv file."""
+    key = hashlib.sha1(os.path.abspath(file_name).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, key + ".pickle")
+
+
+def load_cached(file_name, cache_dir=CACHE_DIR):
+    """Loads a csv file into a FeatureTable, going through a binary cache. The
+        cache file records the csv's modification time and size; if they still
+        match, the pickled table is used and the csv is not parsed at all.
+        Otherwise the csv is parsed and the cache file rewritten.
+
+        Args:
+            file_name - the path of a world factbook csv file
+            cache_dir - the directory for cache files, None to not use a cache
+
+        Returns:
+            A FeatureTable with one row per country.
+        """
+    return load_cached_signed(file_name, cache_dir)[0]
+
+
+def load_cached_signed(file_name, cache_dir=CACHE_DIR, digest=None):
+    """load_cached, also returning the signature of the csv file that was loaded.
+
+        Args:
+            file_name, cache_dir - see load_cached
+            digest - if given, the sha1 the file is known to have now; a cache
+                     file recorded for different contents is not used even if
+                     the modification time and size still match
+
+        Returns:
+            A tuple (FeatureTable, signature) where signature is a tuple
+            (modification time in ns, size in bytes, sha1 hex digest).
+        """
+    stat = os.stat(file_name)
+    key = (CACHE_VERSION, os.path.abspath(file_name), stat.st_mtime_ns, stat.st_size)
+    cached = cache_path(file_name, cache_dir) if cache_dir is not None else None
+    if cached is not None:
+        try:
+            with open(cached, "rb") as file:
+                if pickle.load(file) == key:
+                    cached_digest = pickle.load(file)
+                    if digest is None or digest == cached_digest:
+                        return pickle.load(file), (stat.st_mtime_ns, stat.st_size, cached_digest)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            # a missing or damaged cache file is simply rebuilt
+            pass
+
+    table, digest = read_table(file_name)
+    if cached is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = "%s.%d.tmp" % (cached, os.getpid())
+            with open(tmp, "wb") as file:
+                pickle.dump(key, file, pickle.HIGHEST_PROTOCOL)
+                pickle.dump(digest, file, pickle.HIGHEST_PROTOCOL)
+                pickle.dump(table, file, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cached)
+        except OSError:
+            pass  # no cache (e.g. read only directory) just means parsing next time too
+    return table, (stat.st_mtime_ns, stat.st_size, digest)
+
+
+def diff_tables(old, new):
+    """Summarizes how a feature changed between two loads.
+
+        Args:
+            old, new - FeatureTables (old may be None for a first load)
+
+        Returns:
+            A dictionary with the sorted lists of countries "added" and "removed",
+            and the number of countries present in both whose ranking
+            ("ranks_changed") or value ("values_changed") is different.
+        """
+    old_names = set(old.names) if old is not None else set()
+    new_names = set(new.names)
+    ranks_changed = 0
+    values_changed = 0
+    for name in old_names & new_names:
+        old_rank, old_value = old[name]
+        new_rank, new_value = new[name]
+        ranks_changed += old_rank != new_rank
+        values_changed += old_value != new_value
+    return {"added": sorted(new_names - old_names),
+            "removed": sorted(old_names - new_names),
+            "ranks_changed": ranks_changed,
+            "values_changed": values_changed}
+
+
+class LazyFeatures(Mapping):
+    """Maps feature names (e.g. "population") to FeatureTables. Features are
+        registered with the path of their csv file and only loaded (through
+        load_cached) the first time they are looked up.
+
+    Attributes:
+        paths - a dictionary mapping feature name to csv path
+        aliases - a dictionary mapping other names to registered feature names
+                  (see register_alias)
+        tables - a dictionary of the features loaded so far
+        cache_dir - the directory for cache files, None to not use a cache
+        signatures - a dictionary mapping csv path to the (mtime, size, sha1)
+                     of the file when it was loaded
+        listeners - functions called with the list of feature names every time
+                    features are reloaded or registered again
+        recording - while not None, a set that collects the name of every
+                    feature looked up (see start_recording)
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        """Creates an empty collection of features."""
+        self.paths = {}
+        self.aliases = {}
+        self.tables = {}
+        self.cache_dir = cache_dir
+        self.signatures = {}
+        self.listeners = []
+        self.recording = None
+
+    def register(self, name, file_name):
+        """Adds a feature without loading it. If the name was already
+            registered (or an alias), the listeners are told, as for a reload.
+
+        Args:
+            name - the feature name
+            file_name - the path of the feature's csv file
+        """
+        replaced = name in self
+        self.aliases.pop(name, None)
+        self.paths[name] = file_name
+        self.tables.pop(name, None)
+        if replaced:
+            self.notify([name])
+
+    def register_alias(self, name, existing):
+        """Adds another name for a registered feature. Both names share one
+            table, so the csv file is loaded, cached and reloaded once.
+
+        Args:
+            name - the new name
+            existing - the name of a registered feature (or of an alias)
+        """
+        existing = self.feature(existing)
+        if existing not in self.paths:
+            raise KeyError(existing)
+        replaced = name in self
+        self.paths.pop(name, None)
+        self.tables.pop(name, None)
+        self.aliases[name] = existing
+        if replaced:
+            self.notify([name])
+
+    def feature(self, name):
+        """Returns the registered feature name a name stands for - the name
+            itself unless it is an alias."""
+        return self.aliases.get(name, name)
+
+    def __getitem__(self, name):
+        name = self.aliases.get(name, name)
+        if self.recording is not None:
+            self.recording.add(name)
+        table = self.tables.get(name)
+        if table is None:
+            path = self.paths[name]
+            table, self.signatures[path] = load_cached_signed(path, self.cache_dir)
+            self.tables[name] = table
+        return table
+
+    def __contains__(self, name):
+        return name in self.paths or name in self.aliases
+
+    def __iter__(self):
+        yield from self.paths
+        yield from self.aliases
+
+    def __len__(self):
+        return len(self.paths) + len(self.aliases)
+
+    def __repr__(self):
+        return "<LazyFeatures %d registered, %d loaded>" % (len(self.paths), len(self.tables))
+
+    def is_loaded(self, name):
+        """Returns True if the feature has already been loaded."""
+        return self.feature(name) in self.tables
+
+    def start_recording(self):
+        """Starts collecting the names of the features that get looked up."""
+        self.recording = set()
+
+    def stop_recording(self):
+        """Stops collecting feature names.
+
+        Returns:
+            the set of feature names looked up since start_recording
+        """
+        names = self.recording
+        self.recording = None
+        return names if names is not None else set()
+
+    def add_listener(self, listener):
+        """Registers a function to be called with a list of feature names
+            whenever those features are reloaded or registered again."""
+        self.listeners.append(listener)
+
+    def notify(self, names):
+        """Calls every listener with a list of feature names."""
+        for listener in self.listeners:
+            listener(list(names))
+
+    def reload(self, names, digests=None):
+        """Re-reads features from their csv files (or from an up to date cache
+            file), swaps them in and tells the listeners. Every new table is
+            fully built before the swap, and the swap replaces the whole tables
+            dictionary in one assignment, so a lookup sees either all the old
+            tables or all the new ones, never a half loaded one.
+
+        Args:
+            names - a list of feature names (an alias reloads the feature it
+                    stands for)
+            digests - optional dictionary mapping csv path to the sha1 its file
+                      is known to have now (see load_cached_signed)
+
+        Returns:
+            A dictionary mapping each reloaded feature name to its diff_tables
+            summary. Listeners get the registered names, not aliases.
+        """
+        names = list(dict.fromkeys(self.feature(name) for name in names))
+        digests = digests or {}
+        loaded = {}
+        signatures = {}
+        for name in names:
+            path = self.paths[name]
+            if path not in loaded:
+                loaded[path], signatures[path] = load_cached_signed(path, self.cache_dir,
+                                                                    digests.get(path))
+
+        tables = dict(self.tables)
+        summary = {}
+        for name in names:
+            new = loaded[self.paths[name]]
+            summary[name] = diff_tables(tables.get(name), new)
+            tables[name] = new
+        self.tables = tables
+        self.signatures.update(signatures)
+
+        self.notify(names)
+        return summary
+
+    def changed_files(self, check_hash=False):
+        """Finds the csv files of loaded features that changed since they were
+            loaded - their modification time or size differ, or, with check_hash,
+            their content hash differs. A file whose time or size changed but
+            whose hash did not is not reported.
+
+        Returns:
+            A dictionary mapping each changed csv path to its current sha1.
+        """
+        changed = {}
+        for path in sorted({self.paths[name] for name in self.tables}):
+            old = self.signatures.get(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # a file that disappeared keeps its last loaded data
+            same_stat = old is not None and old[:2] == (stat.st_mtime_ns, stat.st_size)
+            if same_stat and not check_hash:
+                continue
+            digest = file_digest(path)
+            if old is not None and digest == old[2]:
+                self.signatures[path] = (stat.st_mtime_ns, stat.st_size, digest)
+                continue
+            changed[path] = digest
+        return changed
+
+    def refresh(self, check_hash=False):
+        """Reloads only the loaded features whose csv files changed (see
+            changed_files), atomically (see reload).
+
+        Args:
+            check_hash - also compare file contents, to catch edits that kept
+                         the same modification time and size
+
+        Returns:
+            A dictionary mapping each reloaded feature name to its diff_tables
+            summary (empty if nothing changed).
+        """
+        changed = self.changed_files(check_hash)
+        names = [name for name in self.tables if self.paths[name] in changed]
+        if not names:
+            return {}
+        return self.reload(names, changed)
+
+
+def feature_name(file_name):
+    """Derives a feature name from a csv file name, e.g.
+        "world_factbook/people_and_society/median_age.csv" -> "median age"."""
+    return os.path.splitext(os.path.basename(file_name))[0].replace("_", " ")
+
+
+def discover_features(root="world_factbook"):
+    """Walks the world factbook directory and finds every csv file in it. Files
+        are named after their feature; if two categories (sub directories) have a
+        file of the same name, the later one is prefixed with its category, e.g.
+        "economy exports".
+
+        Args:
+            root - the world factbook directory
+
+        Returns:
+            A dictionary mapping feature name to csv path (empty if root does not exist).
+        """
     result = {}
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if not file_name.endswith(".csv"):
+                continue
+            path = os.path.join(dir_path, file_name)
+            name = feature_name(file_name)
+            if name in result:
+                name = feature_name(dir_path) + " " + name
+            result[name] = path
+    return result
+
+
+def _ingest_one(file_name, cache_dir):
+    """Worker for ingest_factbook - loads one csv and times it."""
+    start = time.perf_counter()
+    table = load_cached(file_name, cache_dir)
+    return table, (time.perf_counter() - start) * 1000
+
+
+def ingest_factbook(root="world_factbook", workers=None, cache_dir=None):
+    """Loads every csv under the world factbook directory, parsing the files in
+        parallel in a pool of processes.
+
+        Args:
+            root - the world factbook directory
+            workers - the number of processes (defaults to the number of cpus)
+            cache_dir - the directory for cache files, None (the default) to parse
+                        every file from scratch
+
+        Returns:
+            A tuple (tables, report). tables maps feature name to FeatureTable
+            (the same name -> [ranking, value] view load_csv returns). report is
+            a list of dictionaries, one per file, with the feature name, path,
+            number of rows and parse time in milliseconds.
+        """
+    paths = discover_features(root)
+    tables = {}
+    report = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {name: pool.submit(_ingest_one, path, cache_dir)
+                   for name, path in paths.items()}
+        for name, future in futures.items():
+            table, elapsed = future.result()
+            tables[name] = table
+            report.append({"feature": name, "path": paths[name],
+                           "rows": len(table), "parse_ms": elapsed})
+    return tables, report
+
+
+def make_features(cache_dir=CACHE_DIR, root="world_factbook"):
+    """Registers every feature found under root, plus the short names the
+        chatbot uses (e.g. "gdp", see CHATBOT_FEATURES) - as aliases of the
+        feature found for the same file, so each file is only loaded once.
+        Nothing is read from disk yet.
 
-    with open(file_name, mode='r', newline='') as file:
-        csv_dict_reader = csv.DictReader(file)
-        for row in csv_dict_reader:
-            name = row["name"]
-        
-            ranking = row["ranking"]
-            value = row["value"]
-            result[name.lower()] = [ranking, value]
+        Args:
+            cache_dir - the directory for cache files, None to not use a cache
+            root - the world factbook directory
+
+        Returns:
+            A LazyFeatures mapping.
+        """
+    result = LazyFeatures(cache_dir)
+    discovered = {}
+    for name, path in discover_features(root).items():
+        result.register(name, path)
+        discovered[os.path.normpath(path)] = name
+    for name, file_name in CHATBOT_FEATURES.items():
+        path = os.path.join(root, file_name)
+        existing = discovered.get(os.path.normpath(path))
+        if existing is None:
+            result.register(name, path)
+        elif existing != name:
+            result.register_alias(name, existing)
     return result
 
-features = {}
-features["area"] = load_csv("world_factbook/geography/area.csv")
-features["population"] = load_csv("world_factbook/people_and_society/population.csv")
-features["median age"] = load_csv("world_factbook/people_and_society/median_age.csv")
-features["life expectancy"] = load_csv("world_factbook/people_and_society/life_expectancy_at_birth.csv")
-features["gdp"] = load_csv("world_factbook/economy/real_gdp_purchasing_power_parity.csv")
-features["birth rate"] = load_csv("world_factbook/people_and_society/birth_rate.csv")
-features["death rate"] = load_csv("world_factbook/people_and_society/death_rate.csv")
-
-assert features["population"]["united states"][0] == "3", "US population rank test"
-assert features["life expectancy"]["chile"][1] == "79.57", "Chile life expectancy value test"
-assert features["area"]["south africa"][1] == "1,219,090", "South Africa area value test"
-assert len(features["median age"]) == 226, "Median Age dictionary size test"
-assert features["gdp"]["china"][0] == "1", "China gdp rank test"
-assert features["birth rate"]["niger"][0] == "1", "Niger birth rate rank test"
-assert features["death rate"]["lithuania"][0] == "15.05", "Lithuania death rate rank test"
\ No newline at end of file
+
+def measure_startup(cache_dir=CACHE_DIR):
+    """Times how long it takes to get from nothing to every feature loaded -
+        once with an empty cache (cold, every csv parsed) and once with the cache
+        that run left behind (warm). Also times creating the lazy mapping
+        (make_features - finding and registering the csv files, nothing is
+        read), which is what importing the module pays for now.
+
+        Args:
+            cache_dir - the cache directory to use (the .pickle files cache_path
+                        names are removed first; nothing else in it is touched)
+
+        Returns:
+            A dictionary of times in milliseconds.
+        """
+    for name in os.listdir(cache_dir) if os.path.isdir(cache_dir) else []:
+        if name.endswith(".pickle"):
+            os.remove(os.path.join(cache_dir, name))
+
+    result = {}
+    start = time.perf_counter()
+    lazy = make_features(cache_dir)
+    result["make_features_ms"] = (time.perf_counter() - start) * 1000
+    for label in ("cold_ms", "warm_ms"):
+        start = time.perf_counter()
+        lazy = make_features(cache_dir)
+        for name in lazy:
+            lazy[name]
+        result[label] = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for path in lazy.paths.values():
+        load_table(path)
+    result["uncached_parse_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+features = make_features()
+
+if __name__ == "__main__":
+    assert features["population"]["united states"][0] == "3", "US population rank test"
+    assert features["life expectancy"]["chile"][1] == "79.57", "Chile life expectancy value test"
+    assert features["area"]["south africa"][1] == "1,219,090", "South Africa area value test"
+    assert len(features["median age"]) == 226, "Median Age dictionary size test"
+    assert features["gdp"]["china"][0] == "1", "China gdp rank test"
+    assert features["gdp"] is features["real gdp purchasing power parity"], "gdp alias test"
+    assert "life expectancy" in features and "life expectancy" not in features.paths, "life expectancy alias test"
+    assert features["birth rate"]["niger"][0] == "1", "Niger birth rate rank test"
+    assert features["death rate"]["lithuania"][0] == "15.05", "Lithuania death rate rank test"
+    assert features["population"].rank("united states") == 3, "US population typed rank test"
+    assert features["area"].value("south africa") == 1219090.0, "South Africa typed area value test"
+    assert load_csv("world_factbook/geography/area.csv") == features["area"].as_dict(), "load_csv compatibility test"
+    assert features["population"].country_by_rank(2) == "india", "country_by_rank index test"
+    assert features["population"].top(2) == ["china", "india"], "top test"
+    assert features["population"].ranked_between(2, 3) == ["india", "united states"], "ranked_between test"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "test_feature.csv")
+        with open(csv_path, "w", newline="", encoding="utf-8") as file:
+            file.write("name,ranking,value\nAland,1,100\nBeland,2,50\n")
+        lazy = LazyFeatures(os.path.join(tmp, "cache"))
+        lazy.register("test", csv_path)
+        reloaded = []
+        lazy.add_listener(reloaded.append)
+        old_table = lazy["test"]
+        assert lazy.refresh() == {}, "refresh unchanged test"
+        with open(csv_path, "w", newline="", encoding="utf-8") as file:
+            file.write("name,ranking,value\nBeland,1,150\nAland,2,100\nCeland,3,10\n")
+        assert lazy.changed_files() == {csv_path: file_digest(csv_path)}, "changed_files test"
+        assert lazy.refresh() == {"test": {"added": ["celand"], "removed": [],
+                                           "ranks_changed": 2, "values_changed": 1}}, "refresh diff test"
+        assert old_table["beland"] == ["2", "50"], "refresh keeps old table intact test"
+        assert lazy["test"]["beland"] == ["1", "150"] and lazy["test"] is not old_table, "refresh swap test"
+        assert reloaded == [["test"]], "refresh listener test"
+        fresh = LazyFeatures(lazy.cache_dir)
+        fresh.register("test", csv_path)
+        assert fresh["test"]["celand"] == ["3", "10"], "refresh rewrites cache test"
+        assert lazy.refresh() == {} and reloaded == [["test"]], "refresh idempotent test"
+        stat = os.stat(csv_path)
+        with open(csv_path, "w", newline="", encoding="utf-8") as file:
+            file.write("name,ranking,value\nBeland,1,150\nAland,2,100\nCeland,3,20\n")
+        os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert lazy.refresh() == {}, "refresh same stat test"
+        assert lazy.refresh(check_hash=True)["test"]["values_changed"] == 1, "refresh check_hash test"
+        assert lazy["test"]["celand"] == ["3", "20"], "refresh check_hash swap test"
+        lazy.register_alias("short", "test")
+        assert lazy["short"] is lazy["test"], "alias shares table test"
+        assert list(lazy.reload(["short"])) == ["test"] and reloaded[-1] == ["test"], "alias reload test"
+        lazy.register("test", csv_path)
+        assert reloaded[-1] == ["test"] and not lazy.is_loaded("test"), "register again listener test"
+
+    print(measure_startup())
+
+    tables, report = ingest_factbook()
+    assert tables["median age"].as_dict() == load_csv("world_factbook/people_and_society/median_age.csv"), "ingest test"
+    for entry in sorted(report, key=lambda entry: -entry["parse_ms"]):
+        print("%-45s %6d rows %8.2f ms" % (entry["feature"], entry["rows"], entry["parse_ms"]))
@@ -1,8 +1,32 @@
 # Netid: bsz6907 (Pablo Landa Catan) and Raz Kurteran
-from match import match
+from match import PatternIndex
 from data import features
+from answer_cache import AnswerCache
+from filters import FilterEngine, parse_conditions
+from countries import CountryResolver
+from instrumentation import PatternStats
 import string
 
+# one CountryResolver per feature, built the first time a name is not an
+# exact match, and rebuilt if the feature is reloaded
+resolvers = {}
+
+def find_country(data, feature, name):
+    """Finds the key in a feature's data for a country name as the user typed
+        it - exactly, through an alias ("usa") or with a typo ("untied states").
+
+        Args: data - the feature's FeatureTable, feature - its name,
+        name - the country name.
+
+        Returns: the country's key in data, or None if nothing is close enough.
+    """
+    if name in data:
+        return name
+    entry = resolvers.get(feature)
+    if entry is None or entry[0] is not data:
+        entry = resolvers[feature] = (data, CountryResolver(data))
+    return entry[1].resolve(name)
+
 ##########Action Functions###############################
     
 def country_by_rank(matches):     # matches look like this: ['1', 'population']
@@ -18,12 +42,8 @@ def country_by_rank(matches):     # matches look like this: ['1', 'population']
         empty list. 
     """
     try:
-        data = features[matches[1]]
-        country = ""
-        for key in data:
-            if data[key][0] == matches[0]:
-                country = key
-        if country == "":
+        country = features[matches[1]].country_by_rank(matches[0])
+        if country is None:
             return []            # return empty list when no country at that rank
         return [country]
     except:
@@ -46,7 +66,7 @@ def rank_by_country(matches): # ["united states", "area"]
         current_feature = matches[1]
 
         data = features[current_feature]
-        country = data[searched_country]
+        country = data[find_country(data, current_feature, searched_country)]
         rank = country[0]
 
         return [rank]
@@ -107,7 +127,7 @@ def population_of_country(matches):
         current_feature = "population"
 
         data = features[current_feature]
-        country_info = data[searched_country]
+        country_info = data[find_country(data, current_feature, searched_country)]
         population_value = country_info[1]
 
         return [str(population_value)]
@@ -119,7 +139,7 @@ def median_age_of_country(matches):
     try:
         searched_country = matches[0]
         data = features["median age"]
-        median_age_value = data[searched_country][1]
+        median_age_value = data[find_country(data, "median age", searched_country)][1]
         return [str(median_age_value)]
     except:
         return []   
@@ -128,11 +148,69 @@ def birth_rate_of_country(matches):
     try:
         country = matches[0]
         data = features["birth rate"]
-        if country in data:
-            return [str(data[country][1])]
-        if country.lower() in data:
-            return [str(data[country.lower()][1])]
+        country = find_country(data, "birth rate", country)
+        if country is None:
+            return []
+        return [str(data[country][1])]
+    except:
+        return []
+
+def top_countries(matches):  # ["10", "gdp"]
+    """Returns the countries with the largest values for a feature, largest
+        first, read off the feature's presorted value order.
+
+        Args: matches - a list holding a count and a feature.
+
+        Returns: a list of countries, [] if the count is not a number or the
+        feature is not known.
+    """
+    try:
+        return features[matches[1]].top(int(matches[0]))
+    except:
+        return []
+
+def bottom_countries(matches):  # ["5", "life expectancy"]
+    """Returns the countries with the smallest values for a feature, smallest
+        first.
+
+        Args: matches - a list holding a count and a feature.
+
+        Returns: a list of countries, [] if the count is not a number or the
+        feature is not known.
+    """
+    try:
+        return features[matches[1]].bottom(int(matches[0]))
+    except:
         return []
+
+def countries_in_rank_range(matches):  # ["20", "40", "area"]
+    """Returns the countries ranked between two ranks (inclusive) for a feature,
+        found by binary search over the feature's presorted rankings.
+
+        Args: matches - a list holding a low rank, a high rank and a feature.
+
+        Returns: a list of countries in rank order, [] if a rank is not a number
+        or the feature is not known.
+    """
+    try:
+        return features[matches[2]].ranked_between(int(matches[0]), int(matches[1]))
+    except:
+        return []
+
+country_filter = FilterEngine(features)
+
+def countries_matching(matches):  # ["population over 100,000,000 and median age under 30"]
+    """Returns the countries meeting every condition in a filter question. Each
+        condition is a feature, a comparison (over, under, at least, ...) and a
+        number; conditions are joined with "and".
+
+        Args: matches - a list holding the conditions as one string.
+
+        Returns: a list of countries in alphabetical order, [] if a condition
+        can not be understood or a feature is not known.
+    """
+    try:
+        return country_filter.filter(parse_conditions(matches[0]))
     except:
         return []
 
@@ -148,8 +226,84 @@ pa_list = [(str.split("which country is ranked number _ for %"), country_by_rank
            (str.split("what is the median age of _"), median_age_of_country),
            (str.split("what is the birth rate of _"), birth_rate_of_country),
            (str.split("birth rate of _"), birth_rate_of_country),
+           (str.split("what are the top _ countries by %"), top_countries),
+           (str.split("top _ countries by %"), top_countries),
+           (str.split("top _ by %"), top_countries),
+           (str.split("what are the bottom _ countries by %"), bottom_countries),
+           (str.split("bottom _ countries by %"), bottom_countries),
+           (str.split("bottom _ by %"), bottom_countries),
+           (str.split("which countries are ranked _ to _ for %"), countries_in_rank_range),
+           (str.split("countries ranked _ to _ for %"), countries_in_rank_range),
+           (str.split("which countries have %"), countries_matching),
+           (str.split("countries with %"), countries_matching),
            (["bye"], bye_action)]
 
+# patterns are compiled and indexed on their leading words once, so each query only
+# tries the few patterns that could match it
+pa_index = PatternIndex([pattern for pattern, action in pa_list])
+
+# per pattern counters, None while instrumentation is switched off
+pattern_stats = None
+
+def set_instrumentation(on=True):
+    """Switches per pattern instrumentation of dispatch/search_pa_list on or off.
+        Answers served by cached_search_pa_list from the answer cache are
+        counted too. Switching on starts from zeroed counters.
+
+    Args:
+        on - True to switch on, False to switch off
+
+    Returns:
+        the PatternStats being filled in (None when switching off)
+    """
+    global pattern_stats
+    pattern_stats = PatternStats([pattern for pattern, action in pa_list]) if on else None
+    return pattern_stats
+
+
+def dispatch(src, stats=None):
+    """Like search_pa_list, but also tells which pattern answered.
+
+    Args:
+        src - a phrase represented as a list of words (strings)
+        stats - a PatternStats counting attempts, hits, "No answers" and action
+                function time for every pattern tried; by default the one
+                set_instrumentation switched on (None while it is off)
+
+    Returns:
+        a tuple (index of the matching pattern in pa_list or None if no pattern
+        matched, list of answers as search_pa_list returns them)
+    """
+    if stats is None:
+        stats = pattern_stats
+    if stats is not None:
+        stats.queries += 1
+
+    patterns = pa_index.patterns
+    for pattern_index in pa_index.candidates(src):
+        if stats is not None:
+            stats.counters[pattern_index].attempts += 1
+        match_res = patterns[pattern_index].match(src)
+        if match_res is None:
+            continue
+
+        action = pa_list[pattern_index][1]
+        if stats is None:
+            result = action(match_res)
+        else:
+            result = stats.run_action(pattern_index, action, match_res)
+
+        if len(result) == 0:
+            if stats is not None:
+                stats.counters[pattern_index].no_answers += 1
+            return pattern_index, ["No answers"]
+
+        return pattern_index, result
+
+    if stats is not None:
+        stats.not_understood += 1
+    return None, ["I don't understand"]
+
 
 def search_pa_list(src):
     """Takes source, finds matching pattern and calls corresponding action. If it finds
@@ -163,22 +317,54 @@ def search_pa_list(src):
         a list of answers. Will be ["I don't understand"] if it finds no matches and
         ["No answers"] if it finds a match but no answers
     """
-    result = ["I don't understand"]
+    return dispatch(src)[1]
 
-    for pattern in pa_list:
-        pattern_string = pattern[0]
-        pattern_function = pattern[1]
 
-        match_res = match(pattern_string, src)
-        if match_res or pattern_string == src:
-            result = pattern_function(match_res)
+# answers to repeated questions, dropped when a feature they used is reloaded
+answer_cache = AnswerCache(maxsize=4096, ttl=3600)
+features.add_listener(answer_cache.invalidate_features)
 
-            if len(result) == 0:
-                return ["No answers"]
 
-            return result
+def cached_search_pa_list(src):
+    """search_pa_list with the answer cache in front of it. Questions are keyed
+        on their cleaned words; the features the action function looked up are
+        recorded so the answer can be invalidated when one of them is reloaded,
+        and the index of the pattern that answered is kept with the answer so
+        cached answers are counted by the instrumentation as well.
 
-    return result
+    Args:
+        src - a phrase represented as a list of words (strings)
+
+    Returns:
+        the same answers search_pa_list would return
+    """
+    key = tuple(src)
+    hit = answer_cache.get_tagged(key)
+    if hit is not None:
+        answer, pattern_index = hit
+        if pattern_stats is not None:
+            pattern_stats.record_cached(pattern_index, answer)
+        return answer
+    features.start_recording()
+    try:
+        pattern_index, answer = dispatch(src)
+    finally:
+        used = features.stop_recording()
+    answer_cache.put(key, answer, used, pattern_index)
+    return answer
+
+
+def clean_query(text):
+    """Cleans a question the way query_loop does - lower case, trailing
+        punctuation removed, split into words.
+
+    Args:
+        text - the question as typed, a string
+
+    Returns:
+        a list of words (strings) ready for search_pa_list
+    """
+    return text.lower().rstrip(string.punctuation).split()
 
 
 def query_loop():
@@ -195,7 +381,7 @@ def query_loop():
     try:
         while True:
             user_input = input("What do you want?")
-            print(search_pa_list(user_input.lower().rstrip(string.punctuation).split()))
+            print(cached_search_pa_list(clean_query(user_input)))
     except KeyboardInterrupt:
         return
     except EOFError:
@@ -212,6 +398,48 @@ if __name__ == "__main__":
     assert search_pa_list(["what","is","the","median","age","of","japan"]) != ["No answers"], "median_age_of_country returns a value"
     assert search_pa_list(["what","is","the","birth","rate","of","japan"]) != ["No answers"], "birth_rate_of_country returns a value"
 
+    assert search_pa_list(["top", "2", "countries", "by", "population"]) == ["china", "india"], "top test"
+    assert search_pa_list(["countries", "ranked", "2", "to", "3", "for", "population"]) == ["india", "united states"], "rank range test"
+    assert len(search_pa_list(["bottom", "5", "countries", "by", "life", "expectancy"])) == 5, "bottom test"
+    assert search_pa_list(clean_query("top 2 by population")) == ["china", "india"], "top test 2"
+    assert search_pa_list(clean_query("bottom 5 by life expectancy")) == search_pa_list(
+        clean_query("bottom 5 countries by life expectancy")), "bottom test 2"
+    assert len(search_pa_list(clean_query("top 10 by gdp"))) == 10, "top test 3"
+    assert search_pa_list(clean_query("countries with population over 1 and population at most 10")) == ["No answers"], "filter test 1"
+    assert search_pa_list(clean_query("which countries have population over 0 and median age under 1000?")) == sorted(
+        set(features["population"]) & set(features["median age"])), "filter test 2"
+    assert search_pa_list(clean_query("what is untied states ranked for area")) == ["4"], "fuzzy country test 1"
+    assert search_pa_list(clean_query("what is usa ranked for area")) == ["4"], "fuzzy country test 2"
+    assert search_pa_list(clean_query("what is the population of jappan")) == search_pa_list(
+        clean_query("what is the population of japan")), "fuzzy country test 3"
+    stats = set_instrumentation(True)
+    search_pa_list(["hi", "there"])
+    search_pa_list(["what", "is", "XYZ", "ranked", "for", "population"])
+    assert stats.to_dict()["miss_rate"] == 0.5, "instrumentation miss rate test"
+    assert stats.counters[1].hits == 1 and stats.counters[1].no_answers == 1, "instrumentation hit test"
+    set_instrumentation(False)
+    question = ["what", "is", "the", "population", "of", "japan"]
+    assert cached_search_pa_list(question) == search_pa_list(question), "answer cache test 1"
+    assert cached_search_pa_list(question) == search_pa_list(question), "answer cache test 2"
+    assert answer_cache.stats()["hits"] == 1, "answer cache hit test"
+    features.reload(["population"])
+    assert tuple(question) not in answer_cache.entries, "answer cache invalidation test"
+    nested_cache = AnswerCache()
+    nested = [["what", "is", "%"]]
+    nested_cache.put(("kinds",), nested)
+    nested[0].append("oops")
+    nested_cache.get(("kinds",))[0].append("oops")
+    assert nested_cache.get(("kinds",)) == [["what", "is", "%"]], "answer cache nested copy test"
+    stats = set_instrumentation(True)
+    cached_search_pa_list(question)
+    cached_search_pa_list(question)
+    cached_search_pa_list(["hi", "there"])
+    cached_search_pa_list(["hi", "there"])
+    answered = [c for c in stats.counters if c.hits]
+    assert len(answered) == 1 and answered[0].hits == 2 and answered[0].cache_hits == 1, "instrumentation cache hit test"
+    assert stats.queries == 4 and stats.not_understood == 2, "instrumentation cache miss test"
+    set_instrumentation(False)
+
     #uncomment the line below to interact with your chatbot
     query_loop()
 
@@ -0,0 +1,157 @@
+import time
+from collections import OrderedDict
+
+
+def freeze(answer):
+    """Returns answer with every list in it (at any depth) turned into a tuple,
+        so nothing a caller holds can change the cached copy."""
+    if isinstance(answer, list):
+        return tuple(freeze(item) for item in answer)
+    return answer
+
+
+def thaw(answer):
+    """Returns a fresh copy of a frozen answer, with its tuples turned back into
+        lists."""
+    if isinstance(answer, tuple):
+        return [thaw(item) for item in answer]
+    return answer
+
+
+class AnswerCache:
+    """A least recently used cache of chatbot answers. Keys are cleaned
+        questions (tuples of words). Every entry remembers which features its
+        answer was computed from, so reloading a feature only throws away the
+        answers that depended on it.
+
+    Attributes:
+        maxsize - the most answers kept; the least recently used is evicted
+        ttl - seconds an answer stays valid, None for no limit
+        clock - the function used to tell time (time.monotonic)
+        entries - an OrderedDict mapping key to (answer, features, expiry time,
+                  tag), least recently used first; answers are stored frozen
+                  (see freeze)
+        by_feature - a dictionary mapping feature name to the set of keys whose
+                     answers used it
+        hits, misses, evictions, expirations, invalidations - counters
+    """
+
+    def __init__(self, maxsize=4096, ttl=None, clock=time.monotonic):
+        """Creates an empty cache.
+
+        Args:
+            maxsize - the most answers kept
+            ttl - seconds an answer stays valid, None for no limit
+            clock - the function used to tell time
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.by_feature = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Looks up an answer.
+
+        Args:
+            key - a tuple of words
+
+        Returns:
+            a copy of the cached answer (see get_tagged), None on a miss
+        """
+        hit = self.get_tagged(key)
+        return None if hit is None else hit[0]
+
+    def get_tagged(self, key):
+        """Looks up an answer and the tag it was stored with.
+
+        Args:
+            key - a tuple of words
+
+        Returns:
+            (a copy of the cached answer, nested lists included, tag), None on
+            a miss
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        answer, used, expires, tag = entry
+        if expires is not None and self.clock() >= expires:
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return thaw(answer), tag
+
+    def put(self, key, answer, used=(), tag=None):
+        """Stores an answer, evicting the least recently used answers if the
+            cache is full.
+
+        Args:
+            key - a tuple of words
+            answer - a list of strings
+            used - the names of the features the answer was computed from
+            tag - anything to keep with the answer (e.g. the index of the
+                  pattern that answered), returned by get_tagged
+        """
+        if self.maxsize <= 0:
+            return
+        if key in self.entries:
+            self._remove(key)
+        expires = self.clock() + self.ttl if self.ttl is not None else None
+        used = frozenset(used)
+        self.entries[key] = (freeze(answer), used, expires, tag)
+        for name in used:
+            self.by_feature.setdefault(name, set()).add(key)
+        while len(self.entries) > self.maxsize:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def invalidate_features(self, names):
+        """Drops every answer computed from any of the named features.
+
+        Args:
+            names - a list of feature names
+        """
+        for name in names:
+            for key in self.by_feature.pop(name, ()):
+                if key in self.entries:
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        """Drops every answer (the counters are kept)."""
+        self.entries.clear()
+        self.by_feature.clear()
+
+    def stats(self):
+        """Returns the counters and current size as a dictionary."""
+        lookups = self.hits + self.misses
+        return {"size": len(self.entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations}
+
+    def _remove(self, key):
+        answer, used, expires, tag = self.entries.pop(key)
+        for name in used:
+            keys = self.by_feature.get(name)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.by_feature[name]
@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from Assignment3 import clean_query, dispatch, pa_index, pa_list
+
+
+def answer_chunk(questions):
+    """Answers a chunk of questions (in a pool process, or in this one).
+
+    Args:
+        questions - a list of question strings as typed
+
+    Returns:
+        a list of (pattern index or None, answers) tuples, one per question
+    """
+    results = []
+    for question in questions:
+        src = clean_query(question.strip())
+        try:
+            results.append(dispatch(src))
+        except KeyboardInterrupt:  # bye_action - nothing to leave in batch mode
+            results.append((pa_index.first_match(src)[0], ["bye"]))
+    return results
+
+
+def answer_all(questions, processes=None, chunksize=256):
+    """Answers a stream of questions, in order. Questions are read lazily; with
+        a pool, at most two chunks per process are in flight at once.
+
+    Args:
+        questions - an iterable of question strings (e.g. an open file)
+        processes - the number of pool processes, 0 or 1 to answer in this process
+        chunksize - the number of questions sent to a pool process at once
+
+    Returns:
+        a generator of (question, pattern index or None, answers) tuples
+    """
+    questions = iter(questions)
+    if not processes or processes <= 1:
+        for question in questions:
+            (pattern_index, answers), = answer_chunk([question])
+            yield question, pattern_index, answers
+        return
+
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        try:
+            while True:
+                while len(pending) < 2 * processes:
+                    chunk = list(islice(questions, chunksize))
+                    if not chunk:
+                        break
+                    pending.append((chunk, pool.submit(answer_chunk, chunk)))
+                if not pending:
+                    return
+                chunk, future = pending.popleft()
+                for question, (pattern_index, answers) in zip(chunk, future.result()):
+                    yield question, pattern_index, answers
+        finally:
+            for chunk, future in pending:
+                future.cancel()
+
+
+def run_batch(questions, out, processes=None, chunksize=256):
+    """Answers every question and writes one JSON answer list per line to out.
+
+    Args:
+        questions - an iterable of question strings
+        out - a writable text file
+        processes, chunksize - see answer_all
+
+    Returns:
+        a report dictionary - number of questions, seconds, questions per second,
+        hits per pattern (pattern text -> count) and the number of questions no
+        pattern understood
+    """
+    hits = Counter()
+    count = 0
+    start = time.perf_counter()
+    for question, pattern_index, answers in answer_all(questions, processes, chunksize):
+        out.write(json.dumps(answers) + "\n")
+        hits[pattern_index] += 1
+        count += 1
+    elapsed = time.perf_counter() - start
+    not_understood = hits.pop(None, 0)
+    return {"questions": count,
+            "seconds": elapsed,
+            "qps": count / elapsed if elapsed else 0.0,
+            "not_understood": not_understood,
+            "pattern_hits": {" ".join(pa_list[i][0]): n for i, n in hits.most_common()}}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer a file of chatbot questions.")
+    parser.add_argument("questions", nargs="?", default="-",
+                        help="file with one question per line (default: stdin)")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="number of pool processes (default: number of cpus, 1 for none)")
+    parser.add_argument("--chunksize", type=int, default=256)
+    args = parser.parse_args()
+
+    processes = args.processes
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if args.questions == "-":
+        report = run_batch(sys.stdin, sys.stdout, processes, args.chunksize)
+    else:
+        with open(args.questions, encoding="utf-8") as file:
+            report = run_batch(file, sys.stdout, processes, args.chunksize)
+    print(json.dumps(report, indent=2), file=sys.stderr)
@@ -0,0 +1,238 @@
+import argparse
+import json
+import platform
+import random
+import time
+import tracemalloc
+
+from match import PatternIndex, compile_pattern
+
+
+def make_pattern_table(size, wildcard_density=0.3, vocab_size=500, seed=0):
+    """Generates a synthetic pattern table - a list of patterns (lists of strings)
+        that look like pa_list patterns: 2 to 8 words drawn from a fixed vocabulary
+        where some of the words are replaced by _ or %. Every pattern keeps at
+        least one literal word (like every pattern in pa_list), so there are no
+        catch-all patterns such as ['%', '%'] that any query would match.
+
+    Args:
+        size - the number of patterns
+        wildcard_density - the probability that a word is a wildcard (half _, half %)
+        vocab_size - the number of distinct literal words
+        seed - random seed, so runs are comparable
+
+    Returns:
+        a list of patterns
+    """
+    rng = random.Random(seed)
+    table = []
+    for _ in range(size):
+        pattern = []
+        for _ in range(rng.randint(2, 8)):
+            r = rng.random()
+            if r < wildcard_density / 2:
+                pattern.append("_")
+            elif r < wildcard_density:
+                pattern.append("%")
+            else:
+                pattern.append("w%d" % rng.randrange(vocab_size))
+        if all(tok in ("_", "%") for tok in pattern):
+            pattern[rng.randrange(len(pattern))] = "w%d" % rng.randrange(vocab_size)
+        table.append(pattern)
+    return table
+
+
+def make_query_log(table, count, hit_ratio=0.5, vocab_size=500, seed=1):
+    """Generates a synthetic query log for a pattern table. Hits are made by
+        filling in a random pattern's wildcards (_ gets one word, % gets 0 to 3),
+        misses are random sequences of words outside the vocabulary, so (as
+        every pattern has a literal word) they match no pattern. Because %
+        matching is greedy, a few generated hits may not actually match; the
+        benchmark reports the real hit rate.
+
+    Args:
+        table - a list of patterns from make_pattern_table
+        count - the number of queries
+        hit_ratio - the share of queries generated from a pattern
+        vocab_size - the number of distinct words
+        seed - random seed
+
+    Returns:
+        a list of queries (lists of strings)
+    """
+    rng = random.Random(seed)
+    log = []
+    for _ in range(count):
+        if rng.random() < hit_ratio:
+            query = []
+            for tok in rng.choice(table):
+                if tok == "_":
+                    query.append("w%d" % rng.randrange(vocab_size))
+                elif tok == "%":
+                    query.extend("w%d" % rng.randrange(vocab_size)
+                                 for _ in range(rng.randint(0, 3)))
+                else:
+                    query.append(tok)
+        else:
+            query = ["x%d" % rng.randrange(vocab_size) for _ in range(rng.randint(2, 8))]
+        log.append(query)
+    return log
+
+
+def linear_first_match(patterns, source):
+    """The original search_pa_list strategy - try every pattern in order.
+
+    Args:
+        patterns - a list of CompiledPatterns
+        source - a list of strings
+
+    Returns:
+        (index, matched words) of the first pattern that matches, else None
+    """
+    for i, pattern in enumerate(patterns):
+        bindings = pattern.match(source)
+        if bindings is not None:
+            return i, bindings
+    return None
+
+
+def percentile(sorted_values, q):
+    """Returns the q-th percentile (0-100) of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def measure(dispatch, queries, alloc_sample=200):
+    """Runs every query through dispatch and measures it.
+
+    Args:
+        dispatch - a function taking a query and returning a match or None
+        queries - a list of queries
+        alloc_sample - how many queries to run again under tracemalloc to
+                       count the memory blocks a query allocates
+
+    Returns:
+        a dictionary of measurements - queries per second, p50/p99 latency in
+        microseconds, hit rate and the mean number of memory blocks allocated
+        per query (from a tracemalloc snapshot diff, so only blocks still
+        alive when the query returns - its result included - are counted, and
+        not objects CPython reuses from its free lists)
+    """
+    latencies = []
+    hits = 0
+    clock = time.perf_counter_ns
+    start = clock()
+    for query in queries:
+        t = clock()
+        if dispatch(query) is not None:
+            hits += 1
+        latencies.append(clock() - t)
+    total = (clock() - start) / 1e9
+
+    # tracemalloc slows everything down, so allocations are measured on a
+    # separate, smaller pass. The results are kept (in a list allocated before
+    # the first snapshot) so their blocks show up in the diff
+    sample = queries[:alloc_sample]
+    results = [None] * len(sample)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for i in range(len(sample)):
+        results[i] = dispatch(sample[i])
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename")
+                 if stat.traceback[0].filename != tracemalloc.__file__)
+    del results
+
+    latencies.sort()
+    return {"queries": len(queries),
+            "qps": len(queries) / total if total else 0.0,
+            "p50_us": percentile(latencies, 50) / 1000,
+            "p99_us": percentile(latencies, 99) / 1000,
+            "hit_rate": hits / len(queries) if queries else 0.0,
+            "allocs_per_query": blocks / len(sample) if sample else 0.0}
+
+
+def run(sizes=(10, 100, 1000, 10000), densities=(0.1, 0.3, 0.6),
+        hit_ratios=(0.1, 0.9), queries=2000):
+    """Runs the benchmark grid. For every table size, wildcard density and hit
+        ratio the query log is dispatched both by the old linear scan and by the
+        PatternIndex that search_pa_list uses.
+
+    Args:
+        sizes - pattern table sizes
+        densities - wildcard densities
+        hit_ratios - hit ratios for the query logs
+        queries - queries per log
+
+    Returns:
+        a dictionary with the environment and a list of result rows
+    """
+    rows = []
+    for size in sizes:
+        for density in densities:
+            table = make_pattern_table(size, density)
+            compiled = [compile_pattern(p) for p in table]
+            index = PatternIndex(compiled)
+            for hit_ratio in hit_ratios:
+                log = make_query_log(table, queries, hit_ratio)
+                for name, dispatch in (("linear", lambda q: linear_first_match(compiled, q)),
+                                       ("index", index.first_match)):
+                    row = {"dispatch": name, "patterns": size,
+                           "wildcard_density": density, "hit_ratio": hit_ratio}
+                    row.update(measure(dispatch, log))
+                    rows.append(row)
+    return {"python": platform.python_version(),
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": rows}
+
+
+def row_key(row):
+    return (row["dispatch"], row["patterns"], row["wildcard_density"], row["hit_ratio"])
+
+
+def print_report(report, baseline=None):
+    """Prints the result rows as a table. If a baseline report is given, the
+        speedup in queries per second over the matching baseline row is shown too.
+
+    Args:
+        report - a dictionary returned by run
+        baseline - an earlier report (e.g. loaded from JSON), optional
+    """
+    old = {}
+    if baseline:
+        old = {row_key(row): row for row in baseline["results"]}
+    print("%-7s %8s %8s %6s %12s %9s %9s %6s %8s %8s" % (
+        "dispatch", "patterns", "density", "hits", "qps", "p50 us", "p99 us",
+        "match", "allocs", "vs base"))
+    for row in report["results"]:
+        prev = old.get(row_key(row))
+        speedup = "%.2fx" % (row["qps"] / prev["qps"]) if prev and prev["qps"] else "-"
+        print("%-8s %8d %8.2f %6.2f %12.0f %9.2f %9.2f %6.2f %8.1f %8s" % (
+            row["dispatch"], row["patterns"], row["wildcard_density"], row["hit_ratio"],
+            row["qps"], row["p50_us"], row["p99_us"], row["hit_rate"],
+            row["allocs_per_query"], speedup))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark match() and pattern dispatch.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--densities", type=float, nargs="+", default=[0.1, 0.3, 0.6])
+    parser.add_argument("--hit-ratios", type=float, nargs="+", default=[0.1, 0.9])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--out", help="save the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results saved by --out")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.densities, args.hit_ratios, args.queries)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    print_report(report, baseline)
+    if args.out:
+        with open(args.out, "w") as file:
+            json.dump(report, file, indent=2)
@@ -0,0 +1,136 @@
+from functools import lru_cache
+
+# common names -> world factbook names. Only aliases whose factbook name is
+# actually known are used.
+ALIASES = {"usa": "united states",
+           "us": "united states",
+           "america": "united states",
+           "united states of america": "united states",
+           "uk": "united kingdom",
+           "britain": "united kingdom",
+           "great britain": "united kingdom",
+           "england": "united kingdom",
+           "south korea": "korea, south",
+           "north korea": "korea, north",
+           "ivory coast": "cote d'ivoire",
+           "czech republic": "czechia",
+           "myanmar": "burma",
+           "holland": "netherlands",
+           "drc": "congo, democratic republic of the",
+           "east timor": "timor-leste",
+           "swaziland": "eswatini",
+           "macedonia": "north macedonia",
+           "vatican": "holy see (vatican city)",
+           "gambia": "gambia, the",
+           "bahamas": "bahamas, the",
+           "uae": "united arab emirates"}
+
+
+def edit_distance(a, b):
+    """Returns the Levenshtein distance between two strings - the number of
+        single character insertions, deletions and substitutions needed to
+        turn one into the other."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = previous[j - 1] + (ca != cb)
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current.append(cost)
+        previous = current
+    return previous[-1]
+
+
+def default_budget(name):
+    """The number of typos allowed in a name of this length - none for very
+        short names (so "xyz" does not turn into a country), one for medium
+        ones, two for long ones."""
+    if len(name) <= 4:
+        return 0
+    if len(name) <= 8:
+        return 1
+    return 2
+
+
+# the most typos any lookup can allow; the deletion index is built for this many
+MAX_BUDGET = 2
+
+
+def deletions(word, k):
+    """Returns the set of strings made by deleting up to k characters of word
+        (including word itself)."""
+    result = {word}
+    frontier = {word}
+    for _ in range(k):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        result |= frontier
+    return result
+
+
+class CountryResolver:
+    """Resolves the country name a user typed to a known (canonical) name,
+        allowing aliases ("usa") and typos ("untied states").
+
+        Typos are found with a deletion index: every canonical name is stored
+        under each string made by deleting up to MAX_BUDGET of its characters.
+        Two strings within k edits of each other always share such a string, so
+        a lookup only generates the typed name's own deletions, collects the
+        names stored under them and computes the exact edit distance for those
+        few candidates - never for the whole list of countries.
+
+    Attributes:
+        names - the set of canonical names
+        aliases - a dictionary mapping alias to canonical name
+        index - a dictionary mapping a deletion string to the names it came from
+    """
+
+    def __init__(self, names, aliases=ALIASES):
+        """Builds the deletion index over the canonical names.
+
+        Args:
+            names - an iterable of canonical (lower case) country names
+            aliases - a dictionary mapping alias to canonical name
+        """
+        self.names = set(names)
+        self.aliases = {alias: name for alias, name in aliases.items() if name in self.names}
+        self.index = {}
+        for name in sorted(self.names):
+            for variant in deletions(name, MAX_BUDGET):
+                self.index.setdefault(variant, []).append(name)
+        self.resolve = lru_cache(maxsize=4096)(self._resolve)
+
+    def closest(self, name, budget):
+        """Returns the canonical name closest to name within budget typos (at
+            most MAX_BUDGET; ties go to the alphabetically first name), None if
+            there is none."""
+        budget = min(budget, MAX_BUDGET)
+        candidates = set()
+        for variant in deletions(name, budget):
+            candidates.update(self.index.get(variant, ()))
+        best = None
+        best_distance = budget + 1
+        for candidate in sorted(candidates):
+            if abs(len(candidate) - len(name)) >= best_distance:
+                continue
+            d = edit_distance(name, candidate)
+            if d < best_distance:
+                best, best_distance = candidate, d
+        return best
+
+    def _resolve(self, name, budget=None):
+        """Returns the canonical name for what the user typed - the name itself
+            if known, else an alias, else the closest name within the typo
+            budget (default_budget if None). Returns None if nothing is close."""
+        name = name.lower().strip()
+        if name in self.names:
+            return name
+        if name in self.aliases:
+            return self.aliases[name]
+        if budget is None:
+            budget = default_budget(name)
+        return self.closest(name, budget)
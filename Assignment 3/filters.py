@@ -0,0 +1,165 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+# words that can join a feature and a number in a condition, longest first
+OPERATOR_WORDS = [(["greater", "than"], ">"),
+                  (["more", "than"], ">"),
+                  (["less", "than"], "<"),
+                  (["fewer", "than"], "<"),
+                  (["at", "least"], ">="),
+                  (["at", "most"], "<="),
+                  (["over"], ">"),
+                  (["above"], ">"),
+                  (["under"], "<"),
+                  (["below"], "<"),
+                  (["equal", "to"], "=="),
+                  ([">"], ">"),
+                  (["<"], "<"),
+                  ([">="], ">="),
+                  (["<="], "<=")]
+
+
+class Column:
+    """One feature as a numeric column, laid out for fast comparisons. Countries
+        are bits of a Python int (bit i is the country with country_id i), so a
+        set of countries is one int and "and" of two sets is a single &.
+
+    Attributes:
+        table - the FeatureTable the column was built from
+        values - the feature's values sorted smallest first (missing values left out)
+        prefix - prefix[i] is the set of countries holding the i smallest values,
+                 so every comparison is a binary search plus one or two int ops
+    """
+
+    def __init__(self, table):
+        """Builds the column from a FeatureTable.
+
+        Args:
+            table - a FeatureTable
+        """
+        self.table = table
+        rows = sorted((row for row in range(len(table)) if table.values[row] == table.values[row]),
+                      key=table.values.__getitem__)
+        self.values = array("d", (table.values[row] for row in rows))
+        self.prefix = [0] * (len(rows) + 1)
+        mask = 0
+        for i, row in enumerate(rows):
+            mask |= 1 << table.ids[row]
+            self.prefix[i + 1] = mask
+
+    def mask(self, op, number):
+        """Returns the set (int bit mask) of countries whose value compares to
+            number with op, one of >, >=, <, <=, ==."""
+        everything = self.prefix[-1]
+        if op == ">":
+            return everything ^ self.prefix[bisect_right(self.values, number)]
+        if op == ">=":
+            return everything ^ self.prefix[bisect_left(self.values, number)]
+        if op == "<":
+            return self.prefix[bisect_left(self.values, number)]
+        if op == "<=":
+            return self.prefix[bisect_right(self.values, number)]
+        if op == "==":
+            return (self.prefix[bisect_right(self.values, number)]
+                    ^ self.prefix[bisect_left(self.values, number)])
+        raise ValueError("unknown operator %r" % op)
+
+
+class FilterEngine:
+    """Answers "which countries have feature op number and ..." over any number
+        of features. Each feature is turned into a Column once (and again only if
+        the feature is reloaded); a query is then one bit mask per condition,
+        and-ed together.
+
+    Attributes:
+        features - the feature mapping (name -> FeatureTable)
+        columns - a dictionary of the Columns built so far, by feature name
+        names - a dictionary mapping country_id to country name
+    """
+
+    def __init__(self, features):
+        """Creates an engine over a feature mapping. Nothing is built until a
+            feature is first used.
+
+        Args:
+            features - a mapping of feature name to FeatureTable
+        """
+        self.features = features
+        self.columns = {}
+        self.names = {}
+
+    def column(self, feature):
+        """Returns the Column for a feature, rebuilding it if the feature's
+            table has been replaced since. Raises KeyError for unknown features."""
+        table = self.features[feature]
+        column = self.columns.get(feature)
+        if column is None or column.table is not table:
+            column = self.columns[feature] = Column(table)
+            for name, cid in zip(table.names, table.ids):
+                self.names[cid] = name
+        return column
+
+    def mask(self, conditions):
+        """Returns the set (int bit mask) of countries meeting every condition.
+
+        Args:
+            conditions - a list of (feature, op, number) tuples, e.g.
+                         [("population", ">", 100000000), ("median age", "<", 30)]
+        """
+        result = None
+        for feature, op, number in conditions:
+            mask = self.column(feature).mask(op, number)
+            result = mask if result is None else result & mask
+            if not result:
+                break
+        return result or 0
+
+    def filter(self, conditions):
+        """Returns the countries meeting every condition, in alphabetical order.
+
+        Args:
+            conditions - a list of (feature, op, number) tuples
+
+        Returns:
+            a list of country names
+        """
+        mask = self.mask(conditions)
+        result = []
+        while mask:
+            low = mask & -mask
+            result.append(self.names[low.bit_length() - 1])
+            mask ^= low
+        result.sort()
+        return result
+
+
+def parse_number(text):
+    """Parses a number as typed in a question, e.g. "100,000,000" or "$2.5"."""
+    return float(text.replace(",", "").replace("$", "").replace("%", ""))
+
+
+def parse_conditions(text):
+    """Parses the conditions part of a filter question, e.g.
+        "population over 100,000,000 and median age under 30".
+
+    Args:
+        text - a string of conditions joined by "and"
+
+    Returns:
+        a list of (feature, op, number) tuples. Raises ValueError if a condition
+        can not be understood.
+    """
+    conditions = []
+    for clause in text.split(" and "):
+        words = clause.split()
+        if len(words) < 3:
+            raise ValueError("can not understand %r" % clause)
+        number = parse_number(words[-1])
+        words = words[:-1]
+        for op_words, op in OPERATOR_WORDS:
+            if len(words) > len(op_words) and words[-len(op_words):] == op_words:
+                conditions.append((" ".join(words[:-len(op_words)]), op, number))
+                break
+        else:
+            raise ValueError("can not understand %r" % clause)
+    return conditions
@@ -0,0 +1,119 @@
+import json
+import time
+
+
+class PatternCounters:
+    """Counters for one pattern.
+
+    Attributes:
+        attempts - times the pattern was tried against a question
+        hits - times it matched (and its action function ran), or its answer
+               was served from the answer cache
+        cache_hits - how many of the hits were served from the answer cache;
+                     no action function ran for them
+        no_answers - times it matched but the answer was "No answers"
+        action_ns - total time spent in the action function, in nanoseconds
+        histogram - action function latencies; histogram[k] counts calls that
+                    took less than 2**k microseconds (and at least 2**(k-1))
+    """
+
+    def __init__(self):
+        self.attempts = 0
+        self.hits = 0
+        self.cache_hits = 0
+        self.no_answers = 0
+        self.action_ns = 0
+        self.histogram = []
+
+    def record_action(self, elapsed_ns):
+        """Adds one action function call that took elapsed_ns nanoseconds."""
+        self.action_ns += elapsed_ns
+        bucket = (elapsed_ns // 1000).bit_length()
+        if bucket >= len(self.histogram):
+            self.histogram.extend([0] * (bucket + 1 - len(self.histogram)))
+        self.histogram[bucket] += 1
+
+
+class PatternStats:
+    """Per pattern counters for a pattern/action list, plus overall counts.
+
+    Attributes:
+        patterns - the pattern texts, in pa_list order
+        counters - a list of PatternCounters, one per pattern
+        queries - the number of questions seen
+        not_understood - the number of questions no pattern matched
+    """
+
+    def __init__(self, patterns):
+        """Creates zeroed counters.
+
+        Args:
+            patterns - the patterns (lists of strings), in pa_list order
+        """
+        self.patterns = [" ".join(pattern) for pattern in patterns]
+        self.counters = [PatternCounters() for _ in patterns]
+        self.queries = 0
+        self.not_understood = 0
+
+    def run_action(self, pattern_index, action, match_res):
+        """Calls a matched pattern's action function, counting the hit and
+            timing the call.
+
+        Returns:
+            whatever the action function returns
+        """
+        counters = self.counters[pattern_index]
+        counters.hits += 1
+        start = time.perf_counter_ns()
+        try:
+            return action(match_res)
+        finally:
+            counters.record_action(time.perf_counter_ns() - start)
+
+    def record_cached(self, pattern_index, answer):
+        """Counts a question answered from the answer cache - pattern_index is
+            the pattern that answered it when it was cached (None if no pattern
+            understood it). Only that pattern's attempt is counted, as the
+            patterns before it were not tried again."""
+        self.queries += 1
+        if pattern_index is None:
+            self.not_understood += 1
+            return
+        counters = self.counters[pattern_index]
+        counters.attempts += 1
+        counters.hits += 1
+        counters.cache_hits += 1
+        if answer == ["No answers"]:
+            counters.no_answers += 1
+
+    def reset(self):
+        """Zeroes every counter."""
+        self.counters = [PatternCounters() for _ in self.patterns]
+        self.queries = 0
+        self.not_understood = 0
+
+    def to_dict(self):
+        """Returns every counter as a dictionary (ready for JSON)."""
+        rows = []
+        for pattern, c in zip(self.patterns, self.counters):
+            histogram = {}
+            for k, n in enumerate(c.histogram):
+                if n:
+                    histogram["<%dus" % (1 << k)] = n
+            rows.append({"pattern": pattern,
+                         "attempts": c.attempts,
+                         "hits": c.hits,
+                         "cache_hits": c.cache_hits,
+                         "no_answers": c.no_answers,
+                         "mean_action_us": (c.action_ns / (c.hits - c.cache_hits) / 1000
+                                            if c.hits > c.cache_hits else 0.0),
+                         "action_latency": histogram})
+        return {"queries": self.queries,
+                "not_understood": self.not_understood,
+                "miss_rate": self.not_understood / self.queries if self.queries else 0.0,
+                "patterns": rows}
+
+    def dump_json(self, file_name):
+        """Writes to_dict() to a JSON file."""
+        with open(file_name, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
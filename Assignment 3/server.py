@@ -0,0 +1,174 @@
+import argparse
+import asyncio
+import json
+import time
+
+from Assignment3 import cached_search_pa_list, clean_query
+from data import features
+
+# the longest question line a client may send, in bytes
+MAX_LINE = 4096
+
+
+async def handle_client(reader, writer, slots):
+    """Serves one connection. Every line the client sends is a question; every
+        reply is one line holding the answer list as JSON. The reply is flushed
+        (writer.drain) before the next question is read, so a client that does
+        not read its answers stops being served instead of piling up output.
+        "bye" gets the reply ["bye"] and closes the connection.
+
+    Args:
+        reader, writer - the connection's asyncio streams
+        slots - a semaphore limiting how many connections are served at once;
+                extra connections wait for a free slot
+    """
+    async with slots:
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    writer.write(b'["Question too long"]\n')
+                    break
+                if not line:
+                    break
+                src = clean_query(line.decode("utf-8", "replace").strip())
+                try:
+                    answer = cached_search_pa_list(src)
+                except KeyboardInterrupt:  # bye_action
+                    writer.write(b'["bye"]\n')
+                    break
+                writer.write((json.dumps(answer) + "\n").encode("utf-8"))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+def preload_features():
+    """Loads every feature now. Questions are answered on the event loop, so a
+        feature first loaded by a question (a csv parse plus a cache file write)
+        would hold up every connected client."""
+    for name in features:
+        features[name]
+
+
+async def start_server(host="127.0.0.1", port=8410, path=None, max_clients=1000):
+    """Starts the chatbot server on a TCP port, or on a Unix socket if path is
+        given. Every feature is loaded (see preload_features) before the first
+        connection is accepted.
+
+    Args:
+        host, port - the TCP address to listen on
+        path - the path of a Unix socket to listen on instead
+        max_clients - the number of connections served at the same time
+
+    Returns:
+        the asyncio Server
+    """
+    preload_features()
+    slots = asyncio.Semaphore(max_clients)
+
+    async def on_connect(reader, writer):
+        await handle_client(reader, writer, slots)
+
+    if path:
+        return await asyncio.start_unix_server(on_connect, path, limit=MAX_LINE)
+    return await asyncio.start_server(on_connect, host, port, limit=MAX_LINE)
+
+
+async def serve(host="127.0.0.1", port=8410, path=None, max_clients=1000):
+    """Runs the chatbot server until it is cancelled (e.g. Ctrl-C)."""
+    server = await start_server(host, port, path, max_clients)
+    async with server:
+        await server.serve_forever()
+
+
+async def simulated_client(host, port, path, questions, latencies):
+    """One load generator client - asks each question in turn, waiting for each
+        answer, and records the latency of every answer in seconds."""
+    if path:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for question in questions:
+            start = time.perf_counter()
+            writer.write(question.encode("utf-8") + b"\n")
+            await writer.drain()
+            if not await reader.readline():
+                break
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run_load(questions, host="127.0.0.1", port=8410, path=None, clients=200,
+                   per_client=100):
+    """Load generator - runs many simulated clients at once against a running
+        server.
+
+    Args:
+        questions - a list of question strings the clients cycle through
+        host, port, path - where the server listens (see start_server)
+        clients - the number of simultaneous connections
+        per_client - the number of questions each client asks
+
+    Returns:
+        a dictionary with the number of answers, queries per second and the
+        p50/p99/max latency in milliseconds
+    """
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        simulated_client(host, port, path,
+                         [questions[(c + i) % len(questions)] for i in range(per_client)],
+                         latencies)
+        for c in range(clients)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    def pct(q):
+        return latencies[min(len(latencies) - 1, int(q / 100 * len(latencies)))] * 1000
+
+    return {"clients": clients,
+            "answers": len(latencies),
+            "qps": len(latencies) / elapsed,
+            "p50_ms": pct(50) if latencies else 0.0,
+            "p99_ms": pct(99) if latencies else 0.0,
+            "max_ms": latencies[-1] * 1000 if latencies else 0.0}
+
+
+SAMPLE_QUESTIONS = ["what is the population of japan",
+                    "which country is ranked number 1 for population",
+                    "what is united states ranked for area?",
+                    "what is the median age of china",
+                    "what is the birth rate of india",
+                    "hey there"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chatbot line protocol server.")
+    parser.add_argument("mode", choices=["serve", "load"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8410)
+    parser.add_argument("--unix", help="use this Unix socket path instead of TCP")
+    parser.add_argument("--max-clients", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--per-client", type=int, default=100)
+    args = parser.parse_args()
+
+    try:
+        if args.mode == "serve":
+            asyncio.run(serve(args.host, args.port, args.unix, args.max_clients))
+        else:
+            print(asyncio.run(run_load(SAMPLE_QUESTIONS, args.host, args.port, args.unix,
+                                       args.clients, args.per_client)))
+    except KeyboardInterrupt:
+        pass
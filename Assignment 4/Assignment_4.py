@@ -6,7 +6,7 @@ class Profile:
             name - a string
             title - a string
             company - a string
-            connections - a list of profiles
+            connections - a set of profiles
             employment_history - a list of tuples of the form
                                  (title, company, start year, finish year)
                                  e.g. ("VP of Engineering", "Ford", 1998, 2010)
@@ -24,8 +24,9 @@ class Profile:
                 takes 3 strings as input (n, t, c) with default values of ""
                     representing a name, title and company
                 creates an instance of a profile with the name title and
-                    company that were given as input. Connections and
-                    employment_history should be initialized to an empty list
+                    company that were given as input. Connections is
+                    initialized to an empty set, employment_history and
+                    education to empty lists
             self.__str__
                 returns a string representation of the object including
                     information from all attributes
@@ -34,21 +35,70 @@ class Profile:
                     profile to the connections attribute. However, only
                     add the profile if its not already included in the
                     connections attribute. That is, we don't want duplicates
-                    in the list. 
+                    in the list. Connections are kept in a set, so this
+                    check is a single hash lookup rather than a scan.
+
+        Profiles use __slots__, so they carry no per instance __dict__ and
+        only the attributes above can be set. That does not make a network
+        smaller: a set takes far more memory than a list, so at 10
+        connections per profile a Profile network takes about 925 bytes per
+        profile against about 410 with lists and a __dict__ (see
+        benchmark.py memory --compare). The sets are there for constant time
+        duplicate checks. For a compact network use CSRGraph in
+        graph_store.py.
     """
 
+    __slots__ = ("name", "title", "company", "connections", "employment_history",
+                 "education")
+
     def __init__(self, n="", t="", c=""):
         """ Creates an instance of a profile. """
-        pass
+        self.name = n
+        self.title = t
+        self.company = c
+        self.connections = set()
+        self.employment_history = []
+        self.education = []
 
     def __str__(self):
         """ Returns a string representation of the profile."""
-        pass
+        s = self.name + ", " + self.title + " at " + self.company
+        s += "\n  connections: " + str(sorted(p.name for p in self.connections))
+        s += "\n  employment history: " + str(self.employment_history)
+        s += "\n  education: " + str(self.education)
+        return s
+
+    def __repr__(self):
+        return "Profile(%r, %r, %r)" % (self.name, self.title, self.company)
 
     def add_connection(self, a_profile):
         """if the input profile is not already connected to self,
         connect them."""
-        pass
+        self.connections.add(a_profile)
+
+
+# functions called as listener(p1, p2) whenever connect adds a new connection
+# (see add_edge_listener)
+edge_listeners = []
+
+
+def add_edge_listener(listener):
+    """
+    add_edge_listener registers a function to be called as listener(p1, p2)
+    after connect joins two profiles that were not connected before - e.g. a
+    DistanceOracle's edge_added, to keep its cached trees up to date, or a
+    Components' union.
+
+    Inputs: A function of two profiles.
+
+    Returns: None
+    """
+    edge_listeners.append(listener)
+
+
+def remove_edge_listener(listener):
+    """ Unregisters a function registered with add_edge_listener. """
+    edge_listeners.remove(listener)
 
 
 def connect(p1, p2):
@@ -60,7 +110,12 @@ def connect(p1, p2):
 
     Returns: None
     """
-    pass
+    new = bool(edge_listeners) and p2 not in p1.connections
+    p1.add_connection(p2)
+    p2.add_connection(p1)
+    if new:
+        for listener in edge_listeners:
+            listener(p1, p2)
 
 
 def where_did_they_work_together(p1, p2):
@@ -72,91 +127,275 @@ def where_did_they_work_together(p1, p2):
     Inputs: Two profile instances.
 
     Returns: The company name if they worked together. False if they did not.
-    """
+             If they overlapped at more than one company, the first of them
+             in p1's employment_history. Years count at both ends, so a job
+             ending in 2009 overlaps one starting in 2009.
 
-    pass
+    For many profiles, see employment_index.EmploymentIndex.
+    """
+    for title, company, start, finish in p1.employment_history:
+        for title2, company2, start2, finish2 in p2.employment_history:
+            if company == company2 and start <= finish2 and start2 <= finish:
+                return company
+    return False
 
 
-def shortest_path(p1, p2):
+def shortest_path(p1, p2, limit=None, components=None):
     """
     shortest_path determines the distance (and associated path) between two
     profiles. For example, if p2 appears in p1.connections, the distance is
     1 and the path simply contains p1.name and p2.name. See asserts for more
     examples. 
     
-    Inputs: Two profile instances. 
+    Inputs: Two profile instances. Optionally, a depth limit - only paths
+    shorter than limit are looked for, and the search gives up as soon as
+    every shorter path would have been found. Optionally, the Components of
+    the network (see connectivity.py) - profiles it knows to be in different
+    components are answered at once, without a search.
 
     Returns: The distance and path between the two input profiles. 
              None if no path is found
     """
-    pass
+    # breadth first search from both ends at once. Each side keeps a parent
+    # map (profile -> the profile it was reached from, doubling as its visited
+    # set) and expands one whole level at a time, always the smaller frontier.
+    # The first profile reached by both sides lies on a shortest path.
+    if p1 == p2:
+        return 0, [p1.name]
+    if components is not None and components.separated(p1, p2):
+        return None
+    forward = {p1: None}
+    backward = {p2: None}
+    forward_frontier = [p1]
+    backward_frontier = [p2]
+    # after k levels (on both sides together) every path of length k is found
+    levels = 0
+    while forward_frontier and backward_frontier:
+        if limit is not None and levels + 1 >= limit:
+            return None
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meet = expand_level(forward_frontier, forward, backward)
+        else:
+            backward_frontier, meet = expand_level(backward_frontier, backward, forward)
+        levels += 1
+        if meet is not None:
+            path = path_to(meet, forward)
+            path.reverse()
+            path.extend(path_to(backward[meet], backward))
+            return len(path) - 1, path
+    return None
+
+
+def expand_level(frontier, parents, other_parents):
+    """
+    expand_level visits every connection of the profiles in frontier that has
+    not been visited yet, recording where it was reached from in parents.
+
+    Inputs: frontier - a list of profiles (one BFS level)
+            parents - the parent map of this side of the search
+            other_parents - the parent map of the other side (or an empty
+                            dictionary when there is no other side)
+
+    Returns: The next level (a list of profiles) and the first profile found
+             that the other side has visited too, None if there is none.
+             Stops as soon as such a profile is found.
+    """
+    next_frontier = []
+    for curr in frontier:
+        for profile in curr.connections:
+            if profile not in parents:
+                parents[profile] = curr
+                if profile in other_parents:
+                    return next_frontier, profile
+                next_frontier.append(profile)
+    return next_frontier, None
+
+
+def path_to(profile, parents):
+    """
+    path_to follows a parent map from profile back to the start of the search.
+
+    Inputs: A profile (or None) and a parent map.
+
+    Returns: The names along the way, starting with profile's name.
+    """
+    path = []
+    while profile is not None:
+        path.append(profile.name)
+        profile = parents[profile]
+    return path
 
 
 # EXTENSION #1 - this function would be an extension, but not extra credit
-def shortest_path_to_someone_who(p1, predicate):
+def shortest_path_to_someone_who(p1, predicate, index=None):
     """
     shortest_path determines the distance (and associated path) between p1
     and someone who meets the criteria expressed in the predicate. 
     
     Inputs: A profile instance and a predicate (that takes a profile and returns
-    a boolean). 
+    a boolean). Optionally, an AttributeIndex (see predicates.py) - with one,
+    a declarative predicate such as WorksAt("Deloitte") is first turned into
+    the set of profiles meeting it, so the search is skipped when nobody
+    does and otherwise stops at the first profile of the set it reaches,
+    without calling the predicate. Plain functions are called on every
+    profile visited, as before. p1 itself counts if it meets the criteria.
 
     Returns: The distance and path between the two input profiles. 
              None if no path is found
     """
-    pass
-
-
-# some profiles to work with
-sara = Profile("Sara Sood", "Professor of Computer Science", "Northwestern")
-peter = Profile("Peter Zhong", "Software Engineer Intern", "Teladoc Health")
-milan = Profile("Milan McGraw", "Consultant", "FEV Consulting")
-milan.employment_history = [("some role", "some company", 1995, 2001),
-                            ("another role", "another company", 2001, 2009),
-                            ("yet another role", "yet another company", 2009, 2018)]
-masum = Profile("Masum Patel", "Consultant", "Deloitte")
-masum.employment_history = [("another role", "another company", 1995, 1996),
-                            ("yet another role", "yet another company", 1996, 2010)]
-kris = Profile("Kris Hammond", "Professor of Computer Science", "Northwestern")
-bob = Profile("Bob", "Northwestern")
-
-connect(sara, peter)
-connect(sara, peter)  # adding this to make sure no duplicates in connections
-connect(peter, milan)
-connect(masum, milan)
-connect(masum, kris)
-connect(milan, kris)
-
-
-assert len(sara.connections) == 1, "connect test 1"
-assert len(milan.connections) == 3, "connect test 2"
-assert milan in kris.connections and kris in milan.connections, "connect test 3"
-assert sara not in kris.connections, "connect test 4"
-assert where_did_they_work_together(milan, masum) == "yet another company", "where_did_they_work_together test 1"
-assert where_did_they_work_together(milan, kris) == False, "where_did_they_work_together test 2"
-assert shortest_path(sara, kris) == (3,["Sara Sood", "Peter Zhong", "Milan McGraw", "Kris Hammond"]), "shortest path 1"
-assert shortest_path(sara, bob) == None, "shortest path 2"
-
-
-# uncomment the following two test cases if you decide to complete the optional extension
-"""
-# find someone connected to sara who works for deloitte
-assert shortest_path_to_someone_who(sara,lambda x:
-                                         x.company == "Deloitte") == (3,
-                                                                      ['Sara Sood',
-                                                                       'Peter Zhong',
-                                                                       'Milan McGraw',
-                                                                       'Masum Patel'])
-
-
-# find someone connected to sara, who works with sara (but is not herself)
-assert shortest_path_to_someone_who(sara,lambda x:
-                                         x.company == sara.company
-                                         and x.name != sara.name) == (3,
-                                                                      ['Sara Sood',
-                                                                       'Peter Zhong',
-                                                                       'Milan McGraw',
-                                                                       'Kris Hammond'])
-"""
-print("All tests passed!")
+    targets = None
+    if index is not None and hasattr(predicate, "targets"):
+        targets = predicate.targets(index)
+    if targets is not None:
+        if not targets:
+            return None
+        if p1 in targets:
+            return 0, [p1.name]
+    elif predicate(p1):
+        return 0, [p1.name]
+
+    parents = {p1: None}
+    frontier = [p1]
+    while frontier:
+        if targets is not None:
+            frontier, found = expand_level(frontier, parents, targets)
+        else:
+            frontier, found = search_level(frontier, parents, predicate)
+        if found is not None:
+            path = path_to(found, parents)
+            path.reverse()
+            return len(path) - 1, path
+    return None
+
+
+def search_level(frontier, parents, predicate):
+    """
+    search_level is expand_level for a predicate - it visits every connection
+    of the profiles in frontier that has not been visited yet, stopping at the
+    first one the predicate holds for.
+
+    Inputs: frontier - a list of profiles (one BFS level)
+            parents - the parent map of the search
+            predicate - a function that takes a profile and returns a boolean
+
+    Returns: The next level (a list of profiles) and the profile found, None
+             if there is none.
+    """
+    next_frontier = []
+    for curr in frontier:
+        for profile in curr.connections:
+            if profile not in parents:
+                parents[profile] = curr
+                if predicate(profile):
+                    return next_frontier, profile
+                next_frontier.append(profile)
+    return next_frontier, None
+
+
+if __name__ == "__main__":
+    from employment_index import EmploymentIndex
+    from predicates import AttributeIndex, HasTitle, WorkedAt, WorksAt
+    from distance_oracle import DistanceOracle
+    from connectivity import Components
+
+    # some profiles to work with
+    sara = Profile("Sara Sood", "Professor of Computer Science", "Northwestern")
+    peter = Profile("Peter Zhong", "Software Engineer Intern", "Teladoc Health")
+    milan = Profile("Milan McGraw", "Consultant", "FEV Consulting")
+    milan.employment_history = [("some role", "some company", 1995, 2001),
+                                ("another role", "another company", 2001, 2009),
+                                ("yet another role", "yet another company", 2009, 2018)]
+    masum = Profile("Masum Patel", "Consultant", "Deloitte")
+    masum.employment_history = [("another role", "another company", 1995, 1996),
+                                ("yet another role", "yet another company", 1996, 2010)]
+    kris = Profile("Kris Hammond", "Professor of Computer Science", "Northwestern")
+    bob = Profile("Bob", "Northwestern")
+
+    connect(sara, peter)
+    connect(sara, peter)  # adding this to make sure no duplicates in connections
+    connect(peter, milan)
+    connect(masum, milan)
+    connect(masum, kris)
+    connect(milan, kris)
+
+
+    assert len(sara.connections) == 1, "connect test 1"
+    assert len(milan.connections) == 3, "connect test 2"
+    assert milan in kris.connections and kris in milan.connections, "connect test 3"
+    assert sara not in kris.connections, "connect test 4"
+    assert where_did_they_work_together(milan, masum) == "yet another company", "where_did_they_work_together test 1"
+    assert where_did_they_work_together(milan, kris) == False, "where_did_they_work_together test 2"
+    assert shortest_path(sara, kris) == (3,["Sara Sood", "Peter Zhong", "Milan McGraw", "Kris Hammond"]), "shortest path 1"
+    assert shortest_path(sara, bob) == None, "shortest path 2"
+    components = Components([sara, peter, milan, masum, kris])
+    add_edge_listener(components.union)
+    assert components.separated(sara, milan) == False, "components 1"
+    assert components.separated(sara, bob) == False, "components 2"  # bob is not tracked
+    loner = Profile("Lo Ner", "Hermit", "Nowhere")
+    connect(loner, loner)
+    assert components.separated(sara, loner) == True, "components 3"
+    assert shortest_path(sara, loner, components=components) == None, "components 4"
+    assert shortest_path(sara, kris, components=components) == shortest_path(sara, kris), "components 5"
+    assert components.component_size(sara) == 5, "components 6"
+    remove_edge_listener(components.union)
+
+    jobs = EmploymentIndex([sara, peter, milan, masum, kris, bob])
+    assert jobs.where_did_they_work_together(milan, masum) == "yet another company", "employment index 1"
+    assert jobs.where_did_they_work_together(milan, kris) == False, "employment index 2"
+    assert jobs.coworkers(milan) == [(masum, "yet another company")], "employment index 3"
+    assert list(jobs.overlapping_pairs()) == [(masum, milan, "yet another company")], "employment index 4"
+
+
+    # the optional extension
+    # find someone connected to sara who works for deloitte
+    assert shortest_path_to_someone_who(sara,lambda x:
+                                             x.company == "Deloitte") == (3,
+                                                                          ['Sara Sood',
+                                                                           'Peter Zhong',
+                                                                           'Milan McGraw',
+                                                                           'Masum Patel'])
+
+
+    # find someone connected to sara, who works with sara (but is not herself)
+    assert shortest_path_to_someone_who(sara,lambda x:
+                                             x.company == sara.company
+                                             and x.name != sara.name) == (3,
+                                                                          ['Sara Sood',
+                                                                           'Peter Zhong',
+                                                                           'Milan McGraw',
+                                                                           'Kris Hammond'])
+
+    # the same questions as indexed predicates
+    people = AttributeIndex([sara, peter, milan, masum, kris, bob])
+    assert shortest_path_to_someone_who(sara, WorksAt("Deloitte"), people) == (3,
+                                                                           ['Sara Sood',
+                                                                            'Peter Zhong',
+                                                                            'Milan McGraw',
+                                                                            'Masum Patel'])
+    assert shortest_path_to_someone_who(sara,
+                                        WorksAt(sara.company) & (lambda x: x is not sara),
+                                        people) == (3, ['Sara Sood',
+                                                        'Peter Zhong',
+                                                        'Milan McGraw',
+                                                        'Kris Hammond'])
+    assert shortest_path_to_someone_who(sara, WorksAt("Northwestern"), people) == (0, ['Sara Sood'])
+    assert shortest_path_to_someone_who(sara, WorkedAt("another company"), people) == (2,
+                                                                           ['Sara Sood',
+                                                                            'Peter Zhong',
+                                                                            'Milan McGraw'])
+    assert shortest_path_to_someone_who(sara, WorksAt("Nowhere"), people) == None
+    assert shortest_path_to_someone_who(sara, HasTitle("Consultant") | WorksAt("Deloitte"),
+                                        people) == (2, ['Sara Sood', 'Peter Zhong', 'Milan McGraw'])
+    # the distance oracle, with milan as the landmark (connects bob, so last)
+    oracle = DistanceOracle([sara, peter, milan, masum, kris, bob], [milan])
+    add_edge_listener(oracle.edge_added)
+    assert oracle.shortest_path(sara, milan) == (2, ["Sara Sood", "Peter Zhong", "Milan McGraw"]), "distance oracle 1"
+    assert oracle.shortest_path(sara, bob) == None, "distance oracle 2"
+    assert oracle.searches == 0, "distance oracle 3"
+    assert oracle.shortest_path(sara, kris) == shortest_path(sara, kris), "distance oracle 4"
+    connect(bob, masum)
+    assert oracle.shortest_path(bob, milan) == (2, ["Bob", "Masum Patel", "Milan McGraw"]), "distance oracle 5"
+    assert oracle.shortest_path(sara, bob) == shortest_path(sara, bob), "distance oracle 6"
+    remove_edge_listener(oracle.edge_added)
 
+    print("All tests passed!")
@@ -0,0 +1,403 @@
+import argparse
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from Assignment_4 import (Profile, connect, shortest_path, shortest_path_to_someone_who,
+                          where_did_they_work_together)
+from connectivity import Components
+from distance_oracle import DistanceOracle
+from employment_index import EmploymentIndex
+from graph_store import CSRGraph
+from network_analytics import stream_reports
+from predicates import AttributeIndex, WorksAt
+
+
+class ListProfile:
+    """The profile layout the assignment started from, for comparison - a plain
+        class (with a __dict__) keeping its connections in a list."""
+
+    def __init__(self, n="", t="", c=""):
+        self.name = n
+        self.title = t
+        self.company = c
+        self.connections = []
+        self.employment_history = []
+        self.education = []
+
+    def add_connection(self, a_profile):
+        if a_profile not in self.connections:
+            self.connections.append(a_profile)
+
+
+def pseudocode_shortest_path(p1, p2):
+    """shortest_path exactly as planned in shortest_path_pseudocode.py - a list
+        for visited, q.pop(0) and a copied path in every queue entry. Kept as
+        the reference the search engine is checked and timed against."""
+    visited = []
+    q = [(p1, 0, [p1.name])]
+    while q:
+        curr, dist, path = q.pop(0)
+        visited.append(curr)
+        if curr is p2:
+            return dist, path
+        for connection in curr.connections:
+            if connection not in visited:
+                q.append((connection, dist + 1, path + [connection.name]))
+    return None
+
+
+def random_edges(n, degree, seed=410):
+    """Returns a list of about n * degree / 2 random (i, j) pairs over 0..n-1,
+        i != j. Duplicate pairs are possible, just like repeated connect calls."""
+    rng = random.Random(seed)
+    edges = []
+    for _ in range(n * degree // 2):
+        i = rng.randrange(n)
+        j = rng.randrange(n - 1)
+        edges.append((i, j + (j >= i)))
+    return edges
+
+
+def measure_memory(n=1000000, degree=10, cls=Profile, seed=410):
+    """Builds a random network of n profiles and measures its memory with
+        tracemalloc - first the profiles alone, then the connections.
+
+    Args:
+        n - the number of profiles
+        degree - the average number of connections per profile
+        cls - the profile class (Profile or ListProfile)
+        seed - the random seed for the edges
+
+    Returns:
+        a dictionary with bytes per profile, bytes per edge (an edge being one
+        connect call, i.e. two entries in connections) and the build times
+    """
+    names = ["person %d" % i for i in range(n)]
+    edges = random_edges(n, degree, seed)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        profiles = [cls(name, "Engineer", "Acme") for name in names]
+        profile_seconds = time.perf_counter() - start
+        after_profiles = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        for i, j in edges:
+            connect(profiles[i], profiles[j])
+        edge_seconds = time.perf_counter() - start
+        after_edges = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    entries = sum(len(p.connections) for p in profiles) // 2
+    return {"class": cls.__name__,
+            "profiles": n,
+            "edges": entries,
+            "bytes_per_profile": (after_profiles - base) / n,
+            "bytes_per_edge": (after_edges - after_profiles) / entries if entries else 0.0,
+            "profile_seconds": profile_seconds,
+            "edge_seconds": edge_seconds}
+
+
+def random_network(n, degree, seed=410):
+    """Returns a list of n connected-up Profiles with the given average degree."""
+    profiles = [Profile("person %d" % i, "Engineer", "Acme") for i in range(n)]
+    for i, j in random_edges(n, degree, seed):
+        connect(profiles[i], profiles[j])
+    return profiles
+
+
+def time_paths(n=1000000, degree=10, queries=100, function=shortest_path, seed=410):
+    """Times shortest path queries between random pairs of a random network.
+
+    Args:
+        n, degree - the size and average degree of the network
+        queries - the number of random pairs to ask about
+        function - the shortest path function to time
+        seed - the random seed for the network and the pairs
+
+    Returns:
+        a dictionary with the mean and worst query time in milliseconds and the
+        mean distance found
+    """
+    profiles = random_network(n, degree, seed)
+    rng = random.Random(seed + 1)
+    pairs = [(rng.choice(profiles), rng.choice(profiles)) for _ in range(queries)]
+    times = []
+    distances = []
+    for p1, p2 in pairs:
+        start = time.perf_counter()
+        result = function(p1, p2)
+        times.append(time.perf_counter() - start)
+        if result is not None:
+            distances.append(result[0])
+    return {"function": function.__name__,
+            "profiles": n,
+            "queries": queries,
+            "mean_ms": sum(times) / len(times) * 1000,
+            "max_ms": max(times) * 1000,
+            "mean_distance": sum(distances) / len(distances) if distances else None}
+
+
+def time_store(n=1000000, degree=10, queries=100, seed=410):
+    """Times the graph store on a random network - bulk-loading an edge list,
+        saving the binary file, memory-mapping it back and answering shortest
+        path queries on the mapped graph.
+
+    Args:
+        n, degree - the size and average degree of the network
+        queries - the number of random pairs to ask about
+        seed - the random seed for the network and the pairs
+
+    Returns:
+        a dictionary of timings in seconds (mean query time in milliseconds)
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        edges_path = os.path.join(tmp, "edges.tsv")
+        graph_path = os.path.join(tmp, "graph.bin")
+        with open(edges_path, "w", encoding="utf-8") as file:
+            for i, j in random_edges(n, degree, seed):
+                file.write("person %d\tperson %d\n" % (i, j))
+
+        start = time.perf_counter()
+        graph = CSRGraph.from_edge_list(edges_path)
+        load_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        graph.save(graph_path)
+        save_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        mapped = CSRGraph.load(graph_path)
+        map_seconds = time.perf_counter() - start
+
+        rng = random.Random(seed + 1)
+        pairs = [(mapped.profile(rng.randrange(len(mapped))),
+                  mapped.profile(rng.randrange(len(mapped)))) for _ in range(queries)]
+        start = time.perf_counter()
+        for p1, p2 in pairs:
+            shortest_path(p1, p2)
+        query_ms = (time.perf_counter() - start) / queries * 1000
+        result = {"profiles": len(graph),
+                  "edges": graph.edge_count,
+                  "file_bytes": os.path.getsize(graph_path),
+                  "edge_list_seconds": load_seconds,
+                  "save_seconds": save_seconds,
+                  "map_seconds": map_seconds,
+                  "mean_query_ms": query_ms}
+        mapped.close()
+    return result
+
+
+def time_oracle(n=1000000, degree=10, hubs=16, hub_degree=5000, queries=100, seed=410):
+    """Times the distance oracle on a random network with a few hub profiles
+        (each connected to hub_degree random profiles), used as the landmarks.
+        Half the questions ask about a hub and a random profile, half about
+        two random profiles; both are also timed with plain shortest_path.
+
+    Returns:
+        a dictionary with the tree build time in seconds and mean query times
+        in milliseconds
+    """
+    profiles = random_network(n, degree, seed)
+    rng = random.Random(seed + 1)
+    hub_profiles = [Profile("hub %d" % h, "Recruiter", "Acme") for h in range(hubs)]
+    for hub in hub_profiles:
+        for _ in range(hub_degree):
+            connect(hub, rng.choice(profiles))
+    start = time.perf_counter()
+    oracle = DistanceOracle(hub_profiles, hub_profiles)
+    build_seconds = time.perf_counter() - start
+    result = {"profiles": n, "landmarks": hubs, "build_seconds": build_seconds}
+    for label, pairs in (("hub", [(rng.choice(hub_profiles), rng.choice(profiles))
+                                  for _ in range(queries)]),
+                         ("random", [(rng.choice(profiles), rng.choice(profiles))
+                                     for _ in range(queries)])):
+        for function in (oracle.shortest_path, shortest_path):
+            start = time.perf_counter()
+            for p1, p2 in pairs:
+                function(p1, p2)
+            name = "oracle" if function == oracle.shortest_path else "bfs"
+            result["%s_%s_ms" % (label, name)] = (time.perf_counter() - start) / queries * 1000
+    result["searches"] = oracle.searches
+    return result
+
+
+def time_components(n=1000000, degree=10, blocks=100, queries=100, seed=410):
+    """Times shortest path questions on a fragmented network - blocks separate
+        random networks of n / blocks profiles each, so most random pairs are
+        not connected - with a Components union-find of the network passed to
+        shortest_path and without one.
+
+    Returns:
+        a dictionary with component statistics and mean query times in
+        milliseconds
+    """
+    rng = random.Random(seed)
+    size = n // blocks
+    profiles = [Profile("person %d" % i, "Engineer", "Acme") for i in range(size * blocks)]
+    for b in range(blocks):
+        for i, j in random_edges(size, degree, seed + b):
+            connect(profiles[b * size + i], profiles[b * size + j])
+    pairs = [(rng.choice(profiles), rng.choice(profiles)) for _ in range(queries)]
+    start = time.perf_counter()
+    components = Components(profiles)
+    build = time.perf_counter() - start
+    stats = components.stats()
+    result = {"profiles": n, "components": stats["components"], "largest": stats["largest"],
+              "build_seconds": build}
+    for label, tracked in (("union_find_ms", components), ("bfs_ms", None)):
+        start = time.perf_counter()
+        for p1, p2 in pairs:
+            shortest_path(p1, p2, components=tracked)
+        result[label] = (time.perf_counter() - start) / queries * 1000
+    return result
+
+
+def time_analytics(n=1000000, degree=10, sources=256, batch_size=256, processes=1,
+                   seed=410):
+    """Times degrees of separation reports from a number of random sources -
+        searched batch_size at a time, and one at a time for comparison.
+
+    Returns:
+        a dictionary of timings in seconds and the share of pairs within 3 hops
+    """
+    graph, ids = CSRGraph.from_profiles(random_network(n, degree, seed))
+    rng = random.Random(seed + 1)
+    chosen = [rng.randrange(len(graph)) for _ in range(sources)]
+    result = {"profiles": n, "sources": sources}
+    for label, size in (("batched_seconds", batch_size), ("one_at_a_time_seconds", 1)):
+        start = time.perf_counter()
+        for report in stream_reports(graph, chosen, processes, size):
+            pass
+        result[label] = time.perf_counter() - start
+    result["within_3_hops"] = report.within(3)
+    return result
+
+
+def time_who(n=1000000, degree=10, companies=100000, queries=20, seed=410):
+    """Times "nearest profile at company X" on a random network whose profiles
+        work at random companies, with an indexed WorksAt predicate and with the
+        equivalent lambda; half the companies asked about exist, half do not.
+
+    Returns:
+        a dictionary of mean query times in milliseconds
+    """
+    profiles = random_network(n, degree, seed)
+    rng = random.Random(seed + 1)
+    for profile in profiles:
+        profile.company = "company %d" % rng.randrange(companies)
+    index = AttributeIndex(profiles)
+    asked = ["company %d" % rng.randrange(2 * companies) for _ in range(queries)]
+    starts = [rng.choice(profiles) for _ in range(queries)]
+    result = {"profiles": n, "companies": companies}
+    for label, make in (("indexed_ms", WorksAt),
+                        ("lambda_ms", lambda c: (lambda x: x.company == c))):
+        start = time.perf_counter()
+        for company, p1 in zip(asked, starts):
+            shortest_path_to_someone_who(p1, make(company), index)
+        result[label] = (time.perf_counter() - start) / queries * 1000
+    return result
+
+
+def random_histories(n, jobs=4, companies=1000, seed=410):
+    """Returns n Profiles, each with an employment_history of about jobs random
+        jobs (one to ten years each, 1980 to 2024) at one of the given number of
+        companies."""
+    rng = random.Random(seed)
+    profiles = []
+    for i in range(n):
+        profile = Profile("person %d" % i)
+        year = rng.randrange(1980, 2000)
+        for _ in range(rng.randrange(1, 2 * jobs)):
+            finish = year + rng.randrange(1, 10)
+            profile.employment_history.append(
+                ("Engineer", "company %d" % rng.randrange(companies), year, finish))
+            year = finish
+        profiles.append(profile)
+    return profiles
+
+
+def time_jobs(n=100000, companies=1000, queries=100000, seed=410):
+    """Times the employment index on random histories - building it, pairwise
+        questions (against where_did_they_work_together), coworker lists and the
+        sweep over all overlapping pairs, whose peak memory (traced on a second
+        run) should stay small next to the index however many triples it yields.
+
+    Returns:
+        a dictionary of timings in seconds (per query times in microseconds) and
+        the sweep's peak memory in bytes
+    """
+    profiles = random_histories(n, companies=companies, seed=seed)
+    rng = random.Random(seed + 1)
+    pairs = [(rng.choice(profiles), rng.choice(profiles)) for _ in range(queries)]
+
+    start = time.perf_counter()
+    index = EmploymentIndex(profiles)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    indexed = [index.where_did_they_work_together(p1, p2) for p1, p2 in pairs]
+    indexed_us = (time.perf_counter() - start) / queries * 1e6
+    start = time.perf_counter()
+    scanned = [where_did_they_work_together(p1, p2) for p1, p2 in pairs]
+    scan_us = (time.perf_counter() - start) / queries * 1e6
+    assert indexed == scanned
+    start = time.perf_counter()
+    coworkers = sum(len(index.coworkers(p)) for p in profiles[:1000])
+    coworkers_us = (time.perf_counter() - start) / 1000 * 1e6
+    start = time.perf_counter()
+    triples = sum(1 for _ in index.overlapping_pairs())
+    sweep_seconds = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    for _ in index.overlapping_pairs():
+        pass
+    sweep_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"profiles": n,
+            "build_seconds": build_seconds,
+            "pair_index_us": indexed_us,
+            "pair_scan_us": scan_us,
+            "coworkers_us": coworkers_us,
+            "mean_coworkers": coworkers / 1000,
+            "triples": triples,
+            "sweep_seconds": sweep_seconds,
+            "sweep_peak_bytes": sweep_peak}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile network benchmarks.")
+    parser.add_argument("mode", nargs="?", choices=["memory", "paths", "store", "jobs", "who", "oracle",
+                                 "components", "analytics"], default="memory")
+    parser.add_argument("--profiles", type=int, default=1000000)
+    parser.add_argument("--degree", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--compare", action="store_true",
+                        help="also measure the list based profile layout (memory) or "
+                             "the pseudocode search (paths; use a small network)")
+    args = parser.parse_args()
+
+    if args.mode == "memory":
+        print(measure_memory(args.profiles, args.degree))
+        if args.compare:
+            print(measure_memory(args.profiles, args.degree, ListProfile))
+    elif args.mode == "analytics":
+        print(time_analytics(args.profiles, args.degree, sources=args.queries))
+    elif args.mode == "components":
+        print(time_components(args.profiles, args.degree, queries=args.queries))
+    elif args.mode == "oracle":
+        print(time_oracle(args.profiles, args.degree, queries=args.queries))
+    elif args.mode == "who":
+        print(time_who(args.profiles, args.degree, queries=args.queries))
+    elif args.mode == "jobs":
+        print(time_jobs(args.profiles, queries=args.queries * 1000))
+    elif args.mode == "store":
+        print(time_store(args.profiles, args.degree, args.queries))
+    else:
+        print(time_paths(args.profiles, args.degree, args.queries))
+        if args.compare:
+            print(time_paths(args.profiles, args.degree, args.queries,
+                             pseudocode_shortest_path))
@@ -0,0 +1,115 @@
+class Components:
+    """The connected components of a network, kept with a union-find (disjoint
+        set) structure as connections are added, so whether two profiles can
+        reach each other at all is answered without a search.
+
+        Every profile points to a parent; following parents leads to the root
+        that names its component. find shortens the way it walked (path
+        compression) and union hangs the shallower tree under the deeper one
+        (union by rank), so both take close to constant time. Components only
+        ever merge - connections are never removed.
+
+        Only profiles that have been added or unioned are tracked; about any
+        other profile nothing is known.
+
+        A Components belongs to one network: build it from the network's
+        profiles, then keep it up to date by registering its union with
+        add_edge_listener in Assignment_4.py and only adding connections
+        with connect, and pass it to shortest_path there.
+
+    Attributes:
+        parent - a dictionary mapping each tracked profile to its parent (a root
+                 is its own parent)
+        rank - a dictionary mapping each root to the rank (height bound) of its tree
+        size - a dictionary mapping each root to the number of profiles in its
+               component
+        count - the number of components
+    """
+
+    def __init__(self, profiles=()):
+        """Creates the structure, tracking the given profiles and their
+            connections.
+
+        Args:
+            profiles - an iterable of profiles
+        """
+        self.parent = {}
+        self.rank = {}
+        self.size = {}
+        self.count = 0
+        for profile in profiles:
+            self.add(profile)
+            for other in profile.connections:
+                self.union(profile, other)
+
+    def tracks(self, profile):
+        """Returns True if profile is tracked."""
+        return profile in self.parent
+
+    def add(self, profile):
+        """Starts tracking a profile, in a component of its own."""
+        if profile not in self.parent:
+            self.parent[profile] = profile
+            self.rank[profile] = 0
+            self.size[profile] = 1
+            self.count += 1
+
+    def find(self, profile):
+        """Returns the root of a tracked profile's component."""
+        parent = self.parent
+        root = profile
+        while parent[root] is not root:
+            root = parent[root]
+        while parent[profile] is not root:
+            parent[profile], profile = root, parent[profile]
+        return root
+
+    def union(self, p1, p2):
+        """Records that p1 and p2 are connected (tracking them if needed),
+            merging their components."""
+        parent = self.parent
+        r1 = parent.get(p1)
+        if r1 is None:
+            self.add(p1)
+            r1 = p1
+        elif parent[r1] is not r1:
+            r1 = self.find(p1)
+        r2 = parent.get(p2)
+        if r2 is None:
+            self.add(p2)
+            r2 = p2
+        elif parent[r2] is not r2:
+            r2 = self.find(p2)
+        if r1 is r2:
+            return
+        rank = self.rank
+        if rank[r1] < rank[r2]:
+            r1, r2 = r2, r1
+        parent[r2] = r1
+        if rank[r1] == rank[r2]:
+            rank[r1] += 1
+        del rank[r2]
+        self.size[r1] += self.size.pop(r2)
+        self.count -= 1
+
+    def separated(self, p1, p2):
+        """Returns True if p1 and p2 are known not to be connected - both are
+            tracked and in different components. False means they may be."""
+        return (p1 in self.parent and p2 in self.parent
+                and self.find(p1) is not self.find(p2))
+
+    def component_size(self, profile):
+        """Returns the number of profiles in a tracked profile's component."""
+        return self.size[self.find(profile)]
+
+    def stats(self):
+        """Returns component size statistics - the number of components and of
+            profiles tracked, the largest component's size and a histogram
+            mapping component size to the number of components that size."""
+        histogram = {}
+        for size in self.size.values():
+            histogram[size] = histogram.get(size, 0) + 1
+        return {"components": self.count,
+                "profiles": len(self.parent),
+                "largest": max(self.size.values(), default=0),
+                "sizes": dict(sorted(histogram.items()))}
@@ -0,0 +1,181 @@
+from collections import deque
+
+from Assignment_4 import shortest_path
+
+INFINITY = float("inf")
+
+
+class LandmarkTree:
+    """A breadth first search tree rooted at one landmark profile - the
+        distance from the landmark to every profile it can reach, and the
+        profile each was reached from.
+
+    Attributes:
+        landmark - the root profile
+        dist - a dictionary mapping each reachable profile to its distance
+        parent - a dictionary mapping each reachable profile to the next profile
+                 on its way to the landmark (None for the landmark itself)
+    """
+
+    __slots__ = ("landmark", "dist", "parent")
+
+    def __init__(self, landmark):
+        """Runs the BFS from landmark."""
+        self.landmark = landmark
+        dist = self.dist = {landmark: 0}
+        parent = self.parent = {landmark: None}
+        frontier = [landmark]
+        d = 0
+        while frontier:
+            d += 1
+            next_frontier = []
+            for curr in frontier:
+                for profile in curr.connections:
+                    if profile not in dist:
+                        dist[profile] = d
+                        parent[profile] = curr
+                        next_frontier.append(profile)
+            frontier = next_frontier
+
+    def relax(self, queue):
+        """Continues the BFS from the profiles in queue, lowering the distance
+            of every profile that can now be reached faster."""
+        dist = self.dist
+        parent = self.parent
+        while queue:
+            curr = queue.popleft()
+            d = dist[curr] + 1
+            for profile in curr.connections:
+                if dist.get(profile, INFINITY) > d:
+                    dist[profile] = d
+                    parent[profile] = curr
+                    queue.append(profile)
+
+    def edge_added(self, p1, p2):
+        """Repairs the tree after p1 and p2 were connected. A new connection
+            can only shorten distances, so only the profiles it brings closer
+            to the landmark are visited."""
+        d1 = self.dist.get(p1, INFINITY)
+        d2 = self.dist.get(p2, INFINITY)
+        if d1 + 1 < d2:
+            self.dist[p2] = d1 + 1
+            self.parent[p2] = p1
+            self.relax(deque([p2]))
+        elif d2 + 1 < d1:
+            self.dist[p1] = d2 + 1
+            self.parent[p1] = p2
+            self.relax(deque([p1]))
+
+    def path_between(self, p1, p2):
+        """Returns the path from p1 to p2 through the tree (both must be in
+            it), as a list of profiles - up from p1 and down to p2, turning at
+            the first profile the two ways to the landmark share."""
+        up = [p1]
+        while self.parent[up[-1]] is not None:
+            up.append(self.parent[up[-1]])
+        down = [p2]
+        while self.parent[down[-1]] is not None:
+            down.append(self.parent[down[-1]])
+        while len(up) > 1 and len(down) > 1 and up[-2] == down[-2]:
+            up.pop()
+            down.pop()
+        down.pop()
+        down.reverse()
+        return up + down
+
+
+class DistanceOracle:
+    """Opt-in shortest path answers backed by BFS trees from a few landmark
+        (by default the best connected) profiles.
+
+        For any landmark L, d(p1, p2) is at least |d(p1, L) - d(p2, L)| and at
+        most the length of the path between them through L's tree. When the
+        best lower and upper bounds meet - always so when p1 or p2 is a
+        landmark - the tree path is the answer and no search runs. When one
+        of them is in a landmark's tree and the other is not, they are not
+        connected at all. Otherwise shortest_path from Assignment_4.py runs,
+        with a depth limit so it never searches deeper than needed to find a
+        path shorter than the best tree path; if it finds none, the tree path
+        is the answer. (Checking every profile the search visits against the
+        lower bounds as well was measured to cost more than it saved.)
+
+        The trees are kept up to date as connections are added: register the
+        oracle with add_edge_listener(oracle.edge_added) in Assignment_4.py,
+        and only add connections with connect afterwards.
+
+    Attributes:
+        trees - a list of LandmarkTrees, one per landmark
+        exact - the number of questions answered from the trees alone
+        searches - the number of questions that needed a search
+    """
+
+    def __init__(self, profiles, landmarks=4):
+        """Builds the landmark trees.
+
+        Args:
+            profiles - an iterable of profiles to choose landmarks from
+            landmarks - the number of landmarks (the profiles with the most
+                        connections are chosen), or a list of landmark profiles
+        """
+        if isinstance(landmarks, int):
+            landmarks = sorted(profiles, key=lambda p: len(p.connections),
+                               reverse=True)[:landmarks]
+        self.trees = [LandmarkTree(landmark) for landmark in landmarks]
+        self.exact = 0
+        self.searches = 0
+
+    def edge_added(self, p1, p2):
+        """Repairs every landmark tree after p1 and p2 were connected."""
+        for tree in self.trees:
+            tree.edge_added(p1, p2)
+
+    def bounds(self, p1, p2):
+        """Returns (lower bound, upper bound, path) for the distance between p1
+            and p2, where path (a list of profiles) is a path of the upper
+            bound's length; upper bound and path are None if no landmark
+            reaches both. Returns None if the two are known not to be
+            connected."""
+        lower = 0
+        upper = None
+        path = None
+        for tree in self.trees:
+            d1 = tree.dist.get(p1)
+            d2 = tree.dist.get(p2)
+            if d1 is None and d2 is None:
+                continue
+            if d1 is None or d2 is None:
+                return None
+            lower = max(lower, abs(d1 - d2))
+            candidate = tree.path_between(p1, p2)
+            if upper is None or len(candidate) - 1 < upper:
+                upper = len(candidate) - 1
+                path = candidate
+        return lower, upper, path
+
+    def distance(self, p1, p2):
+        """Returns the distance between p1 and p2, None if they are not
+            connected."""
+        result = self.shortest_path(p1, p2)
+        return None if result is None else result[0]
+
+    def shortest_path(self, p1, p2):
+        """Same as shortest_path in Assignment_4.py - returns (distance, list of
+            names) for a shortest path from p1 to p2, None if there is none."""
+        if p1 == p2:
+            return 0, [p1.name]
+        bounds = self.bounds(p1, p2)
+        if bounds is None:
+            self.exact += 1
+            return None
+        lower, upper, path = bounds
+        if upper is not None and lower == upper:
+            self.exact += 1
+            return upper, [p.name for p in path]
+        self.searches += 1
+        found = shortest_path(p1, p2, upper)
+        if found is not None:
+            return found
+        if path is None:
+            return None
+        return upper, [p.name for p in path]
+
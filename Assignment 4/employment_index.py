@@ -0,0 +1,215 @@
+import heapq
+from bisect import bisect_right
+
+
+def overlaps(s1, f1, s2, f2):
+    """Returns True if the years s1..f1 and s2..f2 overlap. Both ends count, so
+        a job ending in 2009 overlaps one starting in 2009."""
+    return s1 <= f2 and s2 <= f1
+
+
+def first_overlap(span1, span2):
+    """Returns the first year two profiles both worked at a company, None if
+        there is none.
+
+    Args:
+        span1, span2 - (start years, finish years) of each profile's time at
+                       the company, as kept in EmploymentIndex.spans
+
+    Returns:
+        the first year covered by a job of both
+    """
+    starts1, finishes1 = span1
+    starts2, finishes2 = span2
+    i = j = 0
+    while i < len(starts1) and j < len(starts2):
+        if overlaps(starts1[i], finishes1[i], starts2[j], finishes2[j]):
+            return max(starts1[i], starts2[j])
+        if finishes1[i] < finishes2[j]:
+            i += 1
+        else:
+            j += 1
+    return None
+
+
+class CompanyIntervals:
+    """Every job at one company, sorted by start year, with a segment tree of
+        finish years. The jobs overlapping a span of years are found without
+        looking at the others: they are a prefix of the list (start year not
+        after the span's end) whose finish year is not before the span's
+        start, and the tree holds the latest finish under every node, so whole
+        subtrees of jobs that ended too early are skipped.
+
+    Attributes:
+        starts, finishes, profiles - the jobs, one entry each, sorted by start
+        size - the number of leaves of the tree (a power of two)
+        tree - tree[1] is the root, the children of node k are 2k and 2k + 1,
+               leaves are size..size + len(starts) - 1; each node holds the
+               latest finish year below it
+    """
+
+    def __init__(self, jobs):
+        """Builds the tree.
+
+        Args:
+            jobs - a list of (start year, finish year, profile) tuples
+        """
+        jobs = sorted(jobs, key=lambda job: (job[0], job[1]))
+        self.starts = [job[0] for job in jobs]
+        self.finishes = [job[1] for job in jobs]
+        self.profiles = [job[2] for job in jobs]
+        size = 1
+        while size < len(jobs):
+            size *= 2
+        self.size = size
+        tree = [float("-inf")] * (2 * size)
+        tree[size:size + len(jobs)] = self.finishes
+        for k in range(size - 1, 0, -1):
+            tree[k] = max(tree[2 * k], tree[2 * k + 1])
+        self.tree = tree
+
+    def overlapping(self, start, finish):
+        """Yields the index of every job overlapping the years start..finish,
+            in start order - O(log n) per job found."""
+        end = bisect_right(self.starts, finish)
+        if not end:
+            return
+        tree = self.tree
+        size = self.size
+        stack = [(1, 0, size)]
+        while stack:
+            node, lo, hi = stack.pop()
+            if lo >= end or tree[node] < start:
+                continue
+            if node >= size:
+                yield node - size
+                continue
+            mid = (lo + hi) // 2
+            stack.append((2 * node + 1, mid, hi))
+            stack.append((2 * node, lo, mid))
+
+
+class EmploymentIndex:
+    """A company-keyed index of the employment_history of many profiles, for
+        finding who worked together without comparing every pair of profiles.
+
+    Attributes:
+        jobs - a dictionary mapping company to its list of
+               (start year, finish year, profile) tuples
+        trees - a dictionary of the CompanyIntervals built so far, by company;
+                a company's entry is dropped when one of its jobs is added
+        spans - a dictionary mapping (profile, company) to that profile's time
+                at the company, its overlapping jobs merged into disjoint
+                spans: (start years, finish years), both sorted - the two
+                lists that answer "did this profile work here at any time
+                during these years" with one binary search
+    """
+
+    def __init__(self, profiles=()):
+        """Creates an index of the employment history of the given profiles.
+
+        Args:
+            profiles - an iterable of profiles
+        """
+        self.jobs = {}
+        self.trees = {}
+        self.spans = {}
+        for profile in profiles:
+            self.add(profile)
+
+    def add(self, profile):
+        """Adds every job in a profile's employment_history to the index. Add
+            each profile once."""
+        by_company = {}
+        for title, company, start, finish in profile.employment_history:
+            self.jobs.setdefault(company, []).append((start, finish, profile))
+            self.trees.pop(company, None)
+            by_company.setdefault(company, []).append((start, finish))
+        for company, years in by_company.items():
+            years.sort()
+            starts = []
+            finishes = []
+            for start, finish in years:
+                if finishes and start <= finishes[-1]:
+                    finishes[-1] = max(finishes[-1], finish)
+                else:
+                    starts.append(start)
+                    finishes.append(finish)
+            self.spans[(profile, company)] = (starts, finishes)
+
+    def tree(self, company):
+        """Returns the CompanyIntervals of a company, building it if needed."""
+        tree = self.trees.get(company)
+        if tree is None:
+            tree = self.trees[company] = CompanyIntervals(self.jobs[company])
+        return tree
+
+    def worked_there_during(self, profile, company, start, finish):
+        """Returns True if profile held a job at company overlapping the years
+            start..finish - one dictionary lookup and one binary search."""
+        span = self.spans.get((profile, company))
+        if span is None:
+            return False
+        starts, finishes = span
+        k = bisect_right(starts, finish)
+        return k > 0 and finishes[k - 1] >= start
+
+    def where_did_they_work_together(self, p1, p2):
+        """Returns the first company in p1's employment_history where p1 and p2
+            overlapped, False if there is none - like where_did_they_work_together
+            in Assignment_4.py, but O(log n) per job of p1 instead of a scan of
+            p2's history."""
+        for title, company, start, finish in p1.employment_history:
+            if self.worked_there_during(p2, company, start, finish):
+                return company
+        return False
+
+    def coworkers(self, profile):
+        """Returns everyone who worked at the same company as profile at the same
+            time, as a list of (other profile, company) tuples in the order of
+            profile's employment_history; each pair is listed once."""
+        result = []
+        seen = set()
+        for title, company, start, finish in profile.employment_history:
+            if company not in self.jobs:
+                continue
+            tree = self.tree(company)
+            for k in tree.overlapping(start, finish):
+                other = tree.profiles[k]
+                if other != profile and (other, company) not in seen:
+                    seen.add((other, company))
+                    result.append((other, company))
+        return result
+
+    def overlapping_pairs(self):
+        """Yields every (profile, profile, company) triple of profiles whose jobs
+            at the company overlapped, each triple once, with a sweep over each
+            company's spans (see spans) in start order. Only the spans still
+            running at the current start year are kept (in a heap keyed on
+            finish year), so memory grows with the number of people working at
+            a company at the same time, not with the number of triples.
+
+            A profile's spans at a company are disjoint, so none of its own are
+            running when the next one starts. Two profiles can still overlap in
+            several spans; a triple is yielded only at their first overlap,
+            found with first_overlap. The work is O(n log n) plus about the
+            number of overlapping spans.
+
+        Yields:
+            (earlier starter, later starter, company) tuples
+        """
+        spans = self.spans
+        for company, jobs in self.jobs.items():
+            members = {profile: spans[(profile, company)] for start, finish, profile in jobs}
+            intervals = sorted((start, finish, n, profile)
+                               for n, (profile, (starts, finishes)) in enumerate(members.items())
+                               for start, finish in zip(starts, finishes))
+            running = []
+            for start, finish, n, profile in intervals:
+                while running and running[0][0] < start:
+                    heapq.heappop(running)
+                span = members[profile]
+                for _, _, other in running:
+                    if first_overlap(members[other], span) == start:
+                        yield other, profile, company
+                heapq.heappush(running, (finish, n, profile))
@@ -0,0 +1,408 @@
+import csv
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Set
+
+# file header: magic, format version, number of profiles, number of targets
+MAGIC = b"CSRG"
+VERSION = 1
+HEADER = struct.Struct("<4sIqq")
+
+# the array type codes used for offsets (8 byte) and targets (4 byte)
+OFFSET_TYPE = "q"
+TARGET_TYPE = "i"
+
+
+def sniff_delimiter(path):
+    """Returns the delimiter for an edge list file - a tab for .tsv files, a
+        comma otherwise."""
+    return "\t" if str(path).lower().endswith(".tsv") else ","
+
+
+def read_rows(path, delimiter=None):
+    """Yields the rows of a CSV/TSV file as lists of strings (spaces after a
+        delimiter are skipped), skipping blank and one field lines."""
+    with open(path, newline="", encoding="utf-8") as file:
+        for row in csv.reader(file, delimiter=delimiter or sniff_delimiter(path),
+                              skipinitialspace=True):
+            if len(row) > 1:
+                yield row
+
+
+def padding(size):
+    """The number of bytes needed after size bytes to reach a multiple of 8."""
+    return -size % 8
+
+
+class StringColumn:
+    """A column of strings stored as one UTF-8 blob plus offsets, the way they
+        sit in a saved graph file. Strings are decoded one at a time, when asked
+        for, so loading a graph does not decode millions of names up front.
+
+    Attributes:
+        offsets - string i is blob[offsets[i]:offsets[i + 1]]
+        blob - the UTF-8 bytes of every string, one after the other
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+def encode_column(strings):
+    """Returns (offsets array, blob bytes) for a list of strings."""
+    offsets = array(OFFSET_TYPE, [0])
+    parts = []
+    size = 0
+    for s in strings:
+        data = s.encode("utf-8")
+        parts.append(data)
+        size += len(data)
+        offsets.append(size)
+    return offsets, b"".join(parts)
+
+
+class CSRGraph:
+    """A read-only professional network in compressed sparse row layout.
+        Profiles are integer ids 0..n-1; the connections of profile i are
+        targets[offsets[i]:offsets[i + 1]], sorted. Every connection is stored
+        in both directions, like connect() does.
+
+    Attributes:
+        offsets - an int64 array (or memoryview) of n + 1 row starts
+        targets - an int32 array (or memoryview) of connection ids
+        names, titles, companies - indexable columns of strings, one per id
+        path - the file a loaded graph is mapped from, None for other graphs
+    """
+
+    def __init__(self, offsets, targets, names, titles, companies, mapped=None, path=None):
+        """Creates a graph from its arrays. Use from_edge_list, from_profiles or
+            load instead of calling this directly."""
+        self.offsets = offsets
+        self.targets = targets
+        self.names = names
+        self.titles = titles
+        self.companies = companies
+        self.mapped = mapped
+        self.path = path
+        self.ids = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def edge_count(self):
+        """The number of connections (each counted once, not once per end)."""
+        loops = sum(1 for i in range(len(self)) if self.has_edge(i, i))
+        return (len(self.targets) - loops) // 2 + loops
+
+    def neighbors(self, i):
+        """Returns the (sorted) connection ids of profile i, without copying."""
+        return self.targets[self.offsets[i]:self.offsets[i + 1]]
+
+    def degree(self, i):
+        """Returns the number of connections of profile i."""
+        return self.offsets[i + 1] - self.offsets[i]
+
+    def has_edge(self, i, j):
+        """Returns True if profiles i and j are connected (binary search)."""
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        k = bisect_left(self.targets, j, lo, hi)
+        return k < hi and self.targets[k] == j
+
+    def profile(self, i):
+        """Returns a ProfileView of profile i."""
+        return ProfileView(self, i)
+
+    def find(self, name):
+        """Returns a ProfileView of the profile with this name, None if there is
+            none. The name -> id dictionary is built on first use."""
+        if self.ids is None:
+            self.ids = {self.names[i]: i for i in range(len(self))}
+        i = self.ids.get(name)
+        return None if i is None else ProfileView(self, i)
+
+    @classmethod
+    def from_edge_list(cls, edges_path, profiles_path=None, delimiter=None):
+        """Bulk-loads a graph from an edge list file in two passes. The first
+            reads the file, assigning ids, counting degrees and keeping each
+            edge as two ints in an array (no per edge Python objects). The
+            second writes every connection straight into its place in targets.
+
+        Args:
+            edges_path - a CSV/TSV file of "name,name" rows, one connection each
+            profiles_path - an optional CSV/TSV file of "name,title,company"
+                            rows; profiles only listed here have no connections
+            delimiter - the field delimiter, by default a tab for .tsv files
+                        and a comma otherwise
+
+        Returns:
+            a CSRGraph
+        """
+        ids = {}
+        names = []
+        titles = []
+        companies = []
+        degrees = array(OFFSET_TYPE)
+
+        def profile_id(name):
+            i = ids[name] = len(names)
+            names.append(name)
+            titles.append("")
+            companies.append("")
+            degrees.append(0)
+            return i
+
+        if profiles_path is not None:
+            for row in read_rows(profiles_path, delimiter):
+                i = ids.get(row[0])
+                if i is None:
+                    i = profile_id(row[0])
+                titles[i] = sys.intern(row[1])
+                companies[i] = sys.intern(row[2]) if len(row) > 2 else ""
+
+        # pass 1 - ids, degrees and the edges as pairs of ids
+        get = ids.get
+        pairs = array(TARGET_TYPE)
+        for row in read_rows(edges_path, delimiter):
+            i = get(row[0])
+            if i is None:
+                i = profile_id(row[0])
+            j = get(row[1])
+            if j is None:
+                j = profile_id(row[1])
+            pairs.append(i)
+            pairs.append(j)
+            degrees[i] += 1
+            if i != j:
+                degrees[j] += 1
+
+        offsets = array(OFFSET_TYPE, [0])
+        total = 0
+        for d in degrees:
+            total += d
+            offsets.append(total)
+
+        # pass 2 - fill each row from its own cursor
+        targets = array(TARGET_TYPE, [0]) * total
+        cursor = offsets[:-1]
+        pair = iter(pairs)
+        for i, j in zip(pair, pair):
+            targets[cursor[i]] = j
+            cursor[i] += 1
+            if i != j:
+                targets[cursor[j]] = i
+                cursor[j] += 1
+        return cls(*sort_rows(offsets, targets), names, titles, companies)
+
+    @classmethod
+    def from_profiles(cls, profiles):
+        """Builds a graph from Profile objects. Profiles reachable through
+            connections but missing from the list are added too.
+
+        Args:
+            profiles - an iterable of Profiles
+
+        Returns:
+            (CSRGraph, ids) - ids maps each Profile to its integer id
+        """
+        order = list(profiles)
+        ids = {p: i for i, p in enumerate(order)}
+        offsets = array(OFFSET_TYPE, [0])
+        targets = array(TARGET_TYPE)
+        k = 0
+        while k < len(order):
+            row = []
+            for q in order[k].connections:
+                j = ids.get(q)
+                if j is None:
+                    j = ids[q] = len(order)
+                    order.append(q)
+                row.append(j)
+            row.sort()
+            targets.extend(row)
+            offsets.append(len(targets))
+            k += 1
+        graph = cls(offsets, targets, [p.name for p in order], [p.title for p in order],
+                    [p.company for p in order])
+        return graph, ids
+
+    def save(self, path):
+        """Writes the graph to a binary file that load can memory-map: a header,
+            the offsets and targets arrays, then each string column (its offsets
+            and UTF-8 blob), every section starting on an 8 byte boundary.
+            Arrays are written in little endian order."""
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, len(self), len(self.targets)))
+            for data in (self.offsets, self.targets):
+                write_array(file, data)
+            for column in (self.names, self.titles, self.companies):
+                if isinstance(column, StringColumn):
+                    offsets, blob = column.offsets, column.blob
+                else:
+                    offsets, blob = encode_column(column)
+                write_array(file, offsets)
+                file.write(blob)
+                file.write(b"\0" * padding(len(blob)))
+
+    @classmethod
+    def load(cls, path):
+        """Memory-maps a file written by save. The arrays are memoryviews of the
+            mapped file, so loading takes the same (short) time for any size of
+            graph and pages are read from disk only when used. Call close when
+            done with the graph.
+
+        Returns:
+            a CSRGraph. Raises ValueError if the file is not a saved graph.
+        """
+        if sys.byteorder != "little":
+            raise ValueError("saved graphs can only be mapped on little endian machines")
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        magic, version, n, m = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            view.release()
+            mapped.close()
+            raise ValueError("%s is not a saved graph (format version %d)" % (path, VERSION))
+        pos = HEADER.size
+
+        def take(typecode, count):
+            nonlocal pos
+            size = count * array(typecode).itemsize
+            section = view[pos:pos + size].cast(typecode)
+            pos += size + padding(size)
+            return section
+
+        offsets = take(OFFSET_TYPE, n + 1)
+        targets = take(TARGET_TYPE, m)
+        columns = []
+        for _ in range(3):
+            string_offsets = take(OFFSET_TYPE, n + 1)
+            columns.append(StringColumn(string_offsets, take("B", string_offsets[-1])))
+        return cls(offsets, targets, *columns, mapped=mapped, path=path)
+
+    def close(self):
+        """Releases the memory-mapped file of a loaded graph (if any). The graph
+            and its views can not be used afterwards."""
+        if self.mapped is not None:
+            for section in (self.offsets, self.targets):
+                section.release()
+            for column in (self.names, self.titles, self.companies):
+                column.offsets.release()
+                column.blob.release()
+            self.mapped.close()
+            self.mapped = None
+
+
+def sort_rows(offsets, targets):
+    """Sorts every row of a CSR layout and drops repeated connections, like
+        add_connection does.
+
+    Returns:
+        the new (offsets, targets)
+    """
+    new_offsets = array(OFFSET_TYPE, [0])
+    new_targets = array(TARGET_TYPE)
+    for i in range(len(offsets) - 1):
+        new_targets.extend(sorted(set(targets[offsets[i]:offsets[i + 1]])))
+        new_offsets.append(len(new_targets))
+    return new_offsets, new_targets
+
+
+def write_array(file, data):
+    """Writes an array (or memoryview) to file in little endian order, padded
+        to a multiple of 8 bytes."""
+    if not isinstance(data, array):
+        data = array(data.format, data)
+    if sys.byteorder != "little":
+        data = array(data.typecode, data)
+        data.byteswap()
+    raw = data.tobytes()
+    file.write(raw)
+    file.write(b"\0" * padding(len(raw)))
+
+
+class Connections(Set):
+    """The connections of a ProfileView - a read-only set of ProfileViews over
+        one row of the graph. Membership is a binary search in the row."""
+
+    __slots__ = ("graph", "id")
+
+    def __init__(self, graph, i):
+        self.graph = graph
+        self.id = i
+
+    def __len__(self):
+        return self.graph.degree(self.id)
+
+    def __iter__(self):
+        graph = self.graph
+        for j in graph.neighbors(self.id):
+            yield ProfileView(graph, j)
+
+    def __contains__(self, profile):
+        return (isinstance(profile, ProfileView) and profile.graph is self.graph
+                and self.graph.has_edge(self.id, profile.id))
+
+
+class ProfileView:
+    """A Profile-compatible, read-only view of one profile of a CSRGraph, so
+        code written for Profiles (shortest_path and friends) runs directly on
+        the graph. Two views of the same profile are equal and hash alike.
+
+    Attributes:
+        graph - the CSRGraph
+        id - the profile's integer id
+        name, title, company - strings, read from the graph
+        connections - a Connections set of ProfileViews
+        employment_history, education - empty; the graph store keeps no history
+    """
+
+    __slots__ = ("graph", "id")
+
+    employment_history = ()
+    education = ()
+
+    def __init__(self, graph, i):
+        self.graph = graph
+        self.id = i
+
+    @property
+    def name(self):
+        return self.graph.names[self.id]
+
+    @property
+    def title(self):
+        return self.graph.titles[self.id]
+
+    @property
+    def company(self):
+        return self.graph.companies[self.id]
+
+    @property
+    def connections(self):
+        return Connections(self.graph, self.id)
+
+    def __eq__(self, other):
+        return (isinstance(other, ProfileView) and self.id == other.id
+                and self.graph is other.graph)
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __str__(self):
+        return "%s, %s at %s (%d connections)" % (self.name, self.title, self.company,
+                                                 self.graph.degree(self.id))
+
+    def __repr__(self):
+        return "ProfileView(%r)" % self.name
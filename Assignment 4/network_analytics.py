@@ -0,0 +1,238 @@
+import argparse
+import json
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from graph_store import CSRGraph
+
+# the graph each pool process works on (see init_worker)
+worker_graph = None
+
+
+def batch_bfs(offsets, targets, sources):
+    """Runs a breadth first search from every source at once. Source k is bit k
+        of a Python int, so one int per profile holds which of the searches
+        have reached it, and one | moves a whole set of searches along an edge.
+        Each level only visits the profiles some search reached in the level
+        before.
+
+    Args:
+        offsets, targets - a graph in CSRGraph layout
+        sources - a list of profile ids
+
+    Returns:
+        (histogram, eccentricities) - histogram[d] is the number of (source,
+        profile) pairs at distance d (d = 0 counts the sources themselves);
+        eccentricities[k] is the distance from sources[k] to the farthest
+        profile it reaches
+    """
+    seen = {}
+    frontier = {}
+    for k, source in enumerate(sources):
+        seen[source] = seen.get(source, 0) | (1 << k)
+        frontier[source] = seen[source]
+    histogram = [len(sources)]
+    eccentricities = [0] * len(sources)
+    d = 0
+    while frontier:
+        d += 1
+        reached = {}
+        for u, searches in frontier.items():
+            for v in targets[offsets[u]:offsets[u + 1]]:
+                reached[v] = reached.get(v, 0) | searches
+        frontier = {}
+        count = 0
+        level = 0
+        for v, searches in reached.items():
+            searches &= ~seen.get(v, 0)
+            if searches:
+                seen[v] = seen.get(v, 0) | searches
+                frontier[v] = searches
+                count += bin(searches).count("1")
+                level |= searches
+        if not count:
+            break
+        histogram.append(count)
+        while level:
+            low = level & -level
+            eccentricities[low.bit_length() - 1] = d
+            level ^= low
+    return histogram, eccentricities
+
+
+class DistanceReport:
+    """Degrees of separation statistics, added to one batch of sources at a
+        time.
+
+    Attributes:
+        profiles - the number of profiles in the network
+        sources - the number of sources added so far
+        histogram - histogram[d] is the number of (source, profile) pairs at
+                    distance d
+        eccentricities - a dictionary mapping source id to its eccentricity
+    """
+
+    def __init__(self, profiles):
+        self.profiles = profiles
+        self.sources = 0
+        self.histogram = []
+        self.eccentricities = {}
+
+    def add(self, sources, histogram, eccentricities):
+        """Adds the result of batch_bfs for a batch of sources."""
+        self.sources += len(sources)
+        if len(histogram) > len(self.histogram):
+            self.histogram.extend([0] * (len(histogram) - len(self.histogram)))
+        for d, count in enumerate(histogram):
+            self.histogram[d] += count
+        self.eccentricities.update(zip(sources, eccentricities))
+
+    @property
+    def pairs(self):
+        """The number of (source, other profile) pairs."""
+        return self.sources * (self.profiles - 1)
+
+    @property
+    def unreachable(self):
+        """The number of (source, other profile) pairs with no path."""
+        return self.pairs - sum(self.histogram[1:])
+
+    def within(self, hops):
+        """Returns the share of (source, other profile) pairs at most hops apart."""
+        return sum(self.histogram[1:hops + 1]) / self.pairs if self.pairs else 0.0
+
+    def to_dict(self, names=None):
+        """Returns the report as a dictionary (ready for JSON). With names (a
+            column of profile names by id) the eccentricity of every source is
+            included by name."""
+        eccentricity_histogram = {}
+        for e in self.eccentricities.values():
+            eccentricity_histogram[e] = eccentricity_histogram.get(e, 0) + 1
+        result = {"profiles": self.profiles,
+                  "sources": self.sources,
+                  "distances": {d: n for d, n in enumerate(self.histogram) if d},
+                  "unreachable": self.unreachable,
+                  "within_3_hops": self.within(3),
+                  "eccentricities": dict(sorted(eccentricity_histogram.items()))}
+        if names is not None:
+            result["eccentricity"] = {names[s]: e for s, e in self.eccentricities.items()}
+        return result
+
+
+def init_worker(path, offsets, targets):
+    """Pool process initializer - maps the saved graph at path, or else builds
+        the arrays that were sent."""
+    global worker_graph
+    if path is not None:
+        worker_graph = CSRGraph.load(path)
+    else:
+        worker_graph = CSRGraph(offsets, targets, None, None, None)
+
+
+def worker_batch(sources):
+    """Runs batch_bfs in a pool process."""
+    return batch_bfs(worker_graph.offsets, worker_graph.targets, sources)
+
+
+def stream_reports(graph, sources=None, processes=None, batch_size=256):
+    """Runs the analytics for many sources, batch_size at a time, and yields the
+        report after every batch, so histograms can be written out as they
+        grow. With a pool, at most two batches per process are in flight;
+        loaded graphs are mapped by each process, others are copied to it once.
+
+    Args:
+        graph - a CSRGraph
+        sources - an iterable of profile ids, by default every profile
+        processes - the number of pool processes, 0 or 1 to work in this process
+        batch_size - the number of sources searched at once
+
+    Returns:
+        a generator of DistanceReports - the same, growing report each time
+    """
+    report = DistanceReport(len(graph))
+    sources = iter(range(len(graph)) if sources is None else sources)
+    if not processes or processes <= 1:
+        while True:
+            batch = list(islice(sources, batch_size))
+            if not batch:
+                return
+            report.add(batch, *batch_bfs(graph.offsets, graph.targets, batch))
+            yield report
+
+    if graph.path is not None:
+        initargs = (graph.path, None, None)
+    else:
+        initargs = (None, graph.offsets, graph.targets)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=processes, initializer=init_worker,
+                             initargs=initargs) as pool:
+        try:
+            while True:
+                while len(pending) < 2 * processes:
+                    batch = list(islice(sources, batch_size))
+                    if not batch:
+                        break
+                    pending.append((batch, pool.submit(worker_batch, batch)))
+                if not pending:
+                    return
+                batch, future = pending.popleft()
+                report.add(batch, *future.result())
+                yield report
+        finally:
+            for batch, future in pending:
+                future.cancel()
+
+
+def analyze(network, sources=None, processes=None, batch_size=256):
+    """Runs the analytics to the end and returns the final report.
+
+    Args:
+        network - a CSRGraph, or an iterable of Profiles
+        sources - the profiles to search from (ids or ProfileViews for a
+                  CSRGraph, Profiles otherwise), by default every profile
+        processes, batch_size - see stream_reports
+
+    Returns:
+        (DistanceReport, graph) - the graph the ids in the report refer to
+    """
+    if isinstance(network, CSRGraph):
+        graph = network
+        if sources is not None:
+            sources = [getattr(s, "id", s) for s in sources]
+    else:
+        graph, ids = CSRGraph.from_profiles(network)
+        if sources is not None:
+            sources = [ids[s] for s in sources]
+    report = DistanceReport(len(graph))
+    for report in stream_reports(graph, sources, processes, batch_size):
+        pass
+    return report, graph
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Degrees of separation reports.")
+    parser.add_argument("graph", help="a saved graph file, or a .csv/.tsv edge list")
+    parser.add_argument("--sources", nargs="*",
+                        help="names of the profiles to report on (default: everyone)")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    if args.graph.lower().endswith((".csv", ".tsv")):
+        graph = CSRGraph.from_edge_list(args.graph)
+    else:
+        graph = CSRGraph.load(args.graph)
+    sources = None
+    if args.sources:
+        sources = []
+        for name in args.sources:
+            profile = graph.find(name)
+            if profile is None:
+                parser.error("no profile named %r" % name)
+            sources.append(profile.id)
+    names = graph.names if args.sources else None
+    for report in stream_reports(graph, sources, args.processes, args.batch_size):
+        print(json.dumps(report.to_dict(names)))
+        sys.stdout.flush()
@@ -0,0 +1,201 @@
+from abc import ABC, abstractmethod
+
+
+class AttributeIndex:
+    """Profiles indexed by company, title and the companies in their
+        employment_history, so a declarative predicate can be turned into the
+        set of profiles that meet it before any search starts. The index is a
+        snapshot - call update after changing a profile's attributes.
+
+    Attributes:
+        by_company - a dictionary mapping company to the set of profiles there now
+        by_title - a dictionary mapping title to a set of profiles
+        by_history_company - a dictionary mapping company to the set of profiles
+                             with a job there in their employment_history
+        keys - a dictionary mapping each indexed profile to the
+               (company, title, history companies) it was indexed under
+    """
+
+    def __init__(self, profiles=()):
+        """Creates an index of the given profiles.
+
+        Args:
+            profiles - an iterable of profiles
+        """
+        self.by_company = {}
+        self.by_title = {}
+        self.by_history_company = {}
+        self.keys = {}
+        for profile in profiles:
+            self.add(profile)
+
+    def add(self, profile):
+        """Adds a profile to the index (or re-indexes it)."""
+        if profile in self.keys:
+            self.remove(profile)
+        history = frozenset(job[1] for job in profile.employment_history)
+        self.keys[profile] = (profile.company, profile.title, history)
+        self.by_company.setdefault(profile.company, set()).add(profile)
+        self.by_title.setdefault(profile.title, set()).add(profile)
+        for company in history:
+            self.by_history_company.setdefault(company, set()).add(profile)
+
+    def remove(self, profile):
+        """Removes a profile from the index."""
+        company, title, history = self.keys.pop(profile)
+        self.by_company[company].discard(profile)
+        self.by_title[title].discard(profile)
+        for company in history:
+            self.by_history_company[company].discard(profile)
+
+    update = add
+
+
+class Predicate(ABC):
+    """A question about a profile that, unlike a lambda, may also be answered for
+        the whole network at once from an AttributeIndex. A predicate is called
+        with a profile like any other predicate; targets(index) returns the set
+        of every profile it holds for, or None if it can not be worked out from
+        the index. Predicates combine with & (and), | (or) and ~ (not); plain
+        functions may be combined with them too. Subclasses must define
+        __call__; one that does not can not be created.
+    """
+
+    @abstractmethod
+    def __call__(self, profile):
+        """Returns True if the predicate holds for profile."""
+
+    def targets(self, index):
+        """Returns the set of profiles in index this predicate holds for, None
+            if the index can not tell. The set must not be changed."""
+        return None
+
+    def __and__(self, other):
+        return All(self, other)
+
+    def __rand__(self, other):
+        return All(other, self)
+
+    def __or__(self, other):
+        return Any(self, other)
+
+    def __ror__(self, other):
+        return Any(other, self)
+
+    def __invert__(self):
+        return Not(self)
+
+
+def as_predicate(predicate):
+    """Returns predicate as a Predicate, wrapping plain functions in Where."""
+    return predicate if isinstance(predicate, Predicate) else Where(predicate)
+
+
+class WorksAt(Predicate):
+    """Holds for profiles whose current company is the given one."""
+
+    def __init__(self, company):
+        self.company = company
+
+    def __call__(self, profile):
+        return profile.company == self.company
+
+    def targets(self, index):
+        return index.by_company.get(self.company, set())
+
+
+class HasTitle(Predicate):
+    """Holds for profiles with the given title."""
+
+    def __init__(self, title):
+        self.title = title
+
+    def __call__(self, profile):
+        return profile.title == self.title
+
+    def targets(self, index):
+        return index.by_title.get(self.title, set())
+
+
+class WorkedAt(Predicate):
+    """Holds for profiles with a job at the given company in their
+        employment_history."""
+
+    def __init__(self, company):
+        self.company = company
+
+    def __call__(self, profile):
+        return any(job[1] == self.company for job in profile.employment_history)
+
+    def targets(self, index):
+        return index.by_history_company.get(self.company, set())
+
+
+class Where(Predicate):
+    """Any function of a profile, as a Predicate. It can not be indexed."""
+
+    def __init__(self, function):
+        self.function = function
+
+    def __call__(self, profile):
+        return self.function(profile)
+
+
+class Not(Predicate):
+    """Holds where the given predicate does not. It can not be indexed on its
+        own, but narrows an All that has an indexed part."""
+
+    def __init__(self, predicate):
+        self.predicate = as_predicate(predicate)
+
+    def __call__(self, profile):
+        return not self.predicate(profile)
+
+
+class All(Predicate):
+    """Holds where every part holds. Its targets are the intersection of the
+        indexed parts' targets, filtered by the other parts; None if no part is
+        indexed."""
+
+    def __init__(self, *parts):
+        self.parts = [as_predicate(part) for part in parts]
+
+    def __call__(self, profile):
+        return all(part(profile) for part in self.parts)
+
+    def targets(self, index):
+        result = None
+        others = []
+        for part in self.parts:
+            targets = part.targets(index)
+            if targets is None:
+                others.append(part)
+            elif result is None:
+                result = targets
+            else:
+                result = result & targets
+        if result is None:
+            return None
+        if others:
+            result = {p for p in result if all(part(p) for part in others)}
+        return result
+
+
+class Any(Predicate):
+    """Holds where at least one part holds. Its targets are the union of the
+        parts' targets; None if any part is not indexed."""
+
+    def __init__(self, *parts):
+        self.parts = [as_predicate(part) for part in parts]
+
+    def __call__(self, profile):
+        return any(part(profile) for part in self.parts)
+
+    def targets(self, index):
+        result = set()
+        for part in self.parts:
+            targets = part.targets(index)
+            if targets is None:
+                return None
+            result |= targets
+        return result